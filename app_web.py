@@ -7,25 +7,42 @@ Evergreen Evolution — Flask app (Render-ready, v4 fixed)
 - Clone Demand (quick + analytics + CSV)
 - Nutrient Advisor (OpenAI optional; local heuristic fallback)
 - DB Upload/Check
-- Ask (Image) inbox for flower questions (uploads to static/uploads, logs to data/qa_log.json)
+- Ask (Image) inbox for flower questions (uploads to static/uploads, logs to data/qa_log.jsonl)
 - Multilingual UI (EN/ES/中文/VI) + /lang/<code>
 - Plan column: dropdown + ✓ toggle (no JS)
 """
 
-import os, sqlite3, csv, json, re
+import os, sqlite3, json, re, shutil, threading, atexit, time
 from datetime import datetime, timedelta, date
+from functools import lru_cache
 from pathlib import Path
-from flask import Flask, render_template_string, request, redirect, url_for, jsonify, make_response, send_from_directory
+from markupsafe import Markup
+from flask import Flask, Response, g, request, redirect, url_for, jsonify, make_response, send_from_directory, stream_with_context
 
-# Optional OpenAI (Advisor)
+# Optional fast JSON encoder for the inline chart data
 try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except Exception:
-    OPENAI_AVAILABLE = False
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---------- App ----------
-flask_app = Flask(__name__)
+# static_folder=None: /static is served by static_file() below (with cache headers),
+# otherwise Flask's built-in static route shadows it.
+flask_app = Flask(__name__, static_folder=None)
+# Page templates are compiled once at import (the *_TMPL objects below); never re-check sources.
+flask_app.jinja_env.auto_reload = False
+# Optional response compression (Flask-Compress): HTML pages shrink 5-10x on the wire.
+# Streamed responses (the CSV download) are left alone so they keep streaming.
+# requirements.txt pins Flask-Compress>=1.20: from 1.19 it leaves weak ETags (ours)
+# as they are and can answer If-None-Match itself; 1.20 turned that on by default,
+# and it is set here anyway so the clone pages' ETags revalidate either way.
+try:
+    from flask_compress import Compress
+    flask_app.config.update(COMPRESS_MIN_SIZE=500, COMPRESS_STREAMS=False,
+                            COMPRESS_EVALUATE_CONDITIONAL_REQUEST=True)
+    Compress(flask_app)
+except ImportError:
+    pass
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
 STATIC_DIR.mkdir(parents=True, exist_ok=True)
@@ -55,8 +72,13 @@ print(">>> Using DB at:", DB_PATH)
 flask_app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10 MB
 UPLOAD_DIR = STATIC_DIR / "uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-ALLOWED_EXTS = {"png","jpg","jpeg","gif","webp","heic","heif"}
-def allowed_file(filename): return "." in filename and filename.rsplit(".",1)[1].lower() in ALLOWED_EXTS
+ALLOWED_EXTS = frozenset({"png","jpg","jpeg","gif","webp","heic","heif"})
+# one C-level match on the name's tail instead of rsplit + lower + set lookup
+_ALLOWED_EXT_RE = re.compile(r"\.(%s)\Z" % "|".join(sorted(ALLOWED_EXTS)), re.IGNORECASE)
+def upload_ext(filename):
+    # the stored name is generated, so only the (lower-cased) extension of the client's name is used
+    m = _ALLOWED_EXT_RE.search(filename)
+    return m.group(1).lower() if m else None
 
 # ---------- i18n ----------
 LANG = {
@@ -131,15 +153,32 @@ LANG = {
         "action":"Hành động","note":"Ghi chú","water":"Tưới","nutrient":"Dinh dưỡng","ipm":"IPM","defol":"Tỉa lá"
     }
 }
-def t(lang, key): return LANG.get(lang, LANG["en"]).get(key, key)
+# Per-language tables with English pre-merged underneath, so a lookup is a single probe.
+_LANG_TABLES = {code: {**LANG["en"], **table} for code, table in LANG.items()}
+def tr(lang): return _LANG_TABLES.get(lang, _LANG_TABLES["en"])  # resolved once per view; templates index it as L['key']
+
+_LANG_DROPDOWNS = {}
 
 def lang_dropdown(current):
-    codes = [("en","EN"),("es","ES"),("zh","中文"),("vi","VI")]
-    links = []
-    for code,label in codes:
-        style = "font-weight:700;" if code==current else ""
-        links.append(f"<a style='{style}' href='{url_for('set_lang', code=code)}'>{label}</a>")
-    return " | ".join(links)
+    # The switcher only varies by the highlighted code (and the mount point), so each
+    # variant is built once; callers pass g.lang, which _load_lang keeps within LANG.
+    key = (current, request.script_root)
+    html = _LANG_DROPDOWNS.get(key)
+    if html is None:
+        codes = [("en","EN"),("es","ES"),("zh","中文"),("vi","VI")]
+        links = []
+        for code,label in codes:
+            style = "font-weight:700;" if code==current else ""
+            links.append(f"<a style='{style}' href='{url_for('set_lang', code=code)}'>{label}</a>")
+        html = _LANG_DROPDOWNS[key] = Markup(" | ".join(links))
+    return html
+
+@flask_app.before_request
+def _load_lang():
+    # read and validate the language cookie once per request; views and the ETag
+    # helpers use g.lang, so an unknown code is mapped to "en" here and nowhere else
+    lang = request.cookies.get("lang", "en")
+    g.lang = lang if lang in LANG else "en"
 
 @flask_app.route("/lang/<code>")
 def set_lang(code):
@@ -149,61 +188,269 @@ def set_lang(code):
     return resp
 
 # ---------- DB helpers ----------
+# One long-lived connection per worker thread instead of a connect/close per request.
+# WAL lets readers proceed while a single writer commits; implicit transactions open
+# with BEGIN IMMEDIATE so concurrent writers queue on the lock instead of hitting SQLITE_BUSY.
+SQLITE_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-20000;
+PRAGMA mmap_size=268435456;
+PRAGMA foreign_keys=ON;
+"""
+_db_local = threading.local()
+_db_generation = 0  # bumped when the DB file is replaced (see upload_db)
+# Every pooled connection -> the thread that owns it. sqlite3 connections can't be weakly
+# referenced and sit in a reference cycle with their statement cache, so a connection left
+# behind by an exited thread (the dev server runs one thread per request) would linger until
+# the cyclic GC ran; instead it is closed the next time any thread opens a connection.
+_db_open = {}
+_db_open_lock = threading.Lock()
+
+def _track_connection(con):
+    with _db_open_lock:
+        for old, owner in list(_db_open.items()):
+            if not owner.is_alive():
+                del _db_open[old]
+                old.close()
+        _db_open[con] = threading.current_thread()
+
+def _untrack_connection(con):
+    with _db_open_lock:
+        _db_open.pop(con, None)
+    con.close()
+
 def get_db():
-    con = sqlite3.connect(str(DB_PATH))
+    con = getattr(_db_local, "con", None)
+    if con is not None and _db_local.generation == _db_generation:
+        return con
+    if con is not None:
+        _untrack_connection(con)
+    con = sqlite3.connect(str(DB_PATH), check_same_thread=False, isolation_level="IMMEDIATE")
     con.row_factory = sqlite3.Row
+    con.create_function("ymd", 1, _sql_ymd, deterministic=True)
+    con.executescript(SQLITE_PRAGMAS)
+    _track_connection(con)
+    _db_local.con = con
+    _db_local.generation = _db_generation
     return con
 
+# Read-only pages (dashboard, clone forecasts, worker dropdown) use a second per-thread
+# connection opened with mode=ro: it can never take the write lock, and it needs no
+# transaction handling because it only ever runs SELECTs in autocommit mode.
+SQLITE_RO_PRAGMAS = """
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-20000;
+PRAGMA mmap_size=268435456;
+"""
+
+def get_db_ro():
+    con = getattr(_db_local, "ro", None)
+    if con is not None and _db_local.ro_generation == _db_generation:
+        return con
+    if con is not None:
+        _untrack_connection(con)
+    uri = DB_PATH.resolve().as_uri() + "?mode=ro"
+    con = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+    con.row_factory = sqlite3.Row
+    con.create_function("ymd", 1, _sql_ymd, deterministic=True)
+    con.executescript(SQLITE_RO_PRAGMAS)
+    _track_connection(con)
+    _db_local.ro = con
+    _db_local.ro_generation = _db_generation
+    return con
+
+# PRAGMA data_version changes whenever another connection commits, but its value is only
+# comparable on one connection. So one process-wide read-only connection that never
+# writes watches it: every commit, from this process's threads or another worker, moves it.
+_db_watch = {"con": None, "generation": -1}
+_db_watch_lock = threading.Lock()
+
+def _close_db_watch():
+    with _db_watch_lock:
+        con, _db_watch["con"] = _db_watch["con"], None
+    if con is not None:
+        con.close()
+
+def db_data_version():
+    """A value that changes whenever anything commits to the DB (paired with _db_generation)."""
+    with _db_watch_lock:
+        con = _db_watch["con"]
+        if con is None or _db_watch["generation"] != _db_generation:
+            if con is not None:
+                con.close()
+            uri = DB_PATH.resolve().as_uri() + "?mode=ro"
+            con = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+            _db_watch.update(con=con, generation=_db_generation)
+        return con.execute("PRAGMA data_version").fetchone()[0]
+
+@flask_app.teardown_request
+def _release_db(exc):
+    # the connection outlives the request: never hand the next request an open transaction
+    con = getattr(_db_local, "con", None)
+    if con is not None and con.in_transaction:
+        con.rollback()
+
+def _reset_db_connections():
+    """Drop this thread's connections and make every other thread reopen on next use."""
+    global _db_generation
+    for attr in ("con", "ro"):
+        con = getattr(_db_local, attr, None)
+        if con is not None:
+            _untrack_connection(con)
+            setattr(_db_local, attr, None)
+    _close_db_watch()
+    _db_generation += 1
+
+@atexit.register
+def _close_db_connections():
+    # Connections live for the whole process, so close them on shutdown: the last
+    # close checkpoints the WAL and removes the -wal/-shm files.
+    with _db_open_lock:
+        cons = list(_db_open)
+        _db_open.clear()
+    for con in cons:
+        try:
+            con.close()
+        except sqlite3.Error:
+            pass
+    _close_db_watch()
+
+# Flower dates are a free-text form field, so stored values include things like
+# "2026-11-2" that strptime accepts but SQLite's date() (zero-padded only) does not.
+def _parse_date_ymd(value):
+    try:
+        return datetime.strptime(str(value).split()[0], "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+def _sql_ymd(value):
+    # registered on every connection as ymd(): SQL sees exactly the dates the Python
+    # parser accepts, whatever the padding, without any stored value being rewritten
+    d = _parse_date_ymd(value)
+    return d.isoformat() if d else None
+
 def _has_column(con, table, column):
     cur = con.execute(f"PRAGMA table_info({table})")
     return any(row[1] == column for row in cur.fetchall())
 
+# All DDL in one script/transaction: one schema-cookie bump and one commit on first boot.
+SCHEMA_SQL = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room TEXT, plants INTEGER, strain TEXT, flower_date TEXT,
+    planned INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_records_flower_date ON records(flower_date, plants);
+CREATE TABLE IF NOT EXISTS workers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS daily (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT, room TEXT, action TEXT, note TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT, assignee_id INTEGER, due_date TEXT, status TEXT,
+    FOREIGN KEY(assignee_id) REFERENCES workers(id)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_assignee ON tasks(assignee_id);
+COMMIT;
+"""
+
 def ensure_schema():
     con = get_db()
     try:
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            room TEXT, plants INTEGER, strain TEXT, flower_date TEXT,
-            planned INTEGER DEFAULT 0
-        )""")
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS workers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT
-        )""")
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS daily (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT, room TEXT, action TEXT, note TEXT
-        )""")
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT, assignee_id INTEGER, due_date TEXT, status TEXT,
-            FOREIGN KEY(assignee_id) REFERENCES workers(id)
-        )""")
-        # backfill planned if the table existed without it
-        if not _has_column(con, "records", "planned"):
+        con.executescript(SCHEMA_SQL)
+    except Exception:
+        if con.in_transaction:
+            con.rollback()
+        raise
+    # backfill planned if the table existed without it
+    if not _has_column(con, "records", "planned"):
+        with con:
             con.execute("ALTER TABLE records ADD COLUMN planned INTEGER DEFAULT 0")
-        con.commit()
-    finally:
-        con.close()
+
+# The schema never changes after boot, so create it once per process rather than per request.
+# If that fails (e.g. the DB is locked while another worker creates it), log it and retry on
+# the first request instead of serving a process that may have no tables.
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _ensure_schema_once():
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        try:
+            ensure_schema()
+        except sqlite3.OperationalError as e:
+            flask_app.logger.warning("Could not create the DB schema, will retry: %s", e)
+            return
+        _schema_ready = True
+
+_ensure_schema_once()
+
+@flask_app.before_request
+def _retry_schema():
+    if not _schema_ready:
+        _ensure_schema_once()
 
 # ---------- static/logo ----------
 def _ensure_logo():
+    # PIL is only imported when the logo actually has to be drawn
+    logo_path = STATIC_DIR / "logo.png"
+    if logo_path.exists():
+        return
     try:
         from PIL import Image
-        logo_path = STATIC_DIR / "logo.png"
-        if not logo_path.exists():
-            img = Image.new('RGB', (128,128), color=(10,30,10))
-            img.save(str(logo_path))
+        img = Image.new('RGB', (128,128), color=(10,30,10))
+        img.save(str(logo_path))
     except Exception:
         pass
 
+# Run once at import, before the WhiteNoise wrap below indexes static/, so the logo is
+# picked up there and index() no longer pays a stat() per dashboard hit.
+_ensure_logo()
+
+# Chart.js for the analytics page. If the versioned build is dropped into static/ at
+# deploy time it is served from here (no third-party DNS/TLS round trip, cached as
+# immutable); otherwise the page falls back to the same pinned build on the CDN.
+CHART_JS_FILE = "chart-4.4.1.umd.min.js"
+CHART_JS_CDN = "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js"
+CHART_JS_LOCAL = (STATIC_DIR / CHART_JS_FILE).is_file()
+
+# Ten years: the max-age WhiteNoise hard-codes for immutable files, so a file gets the
+# same Cache-Control whether the middleware or static_file() answers.
+STATIC_IMMUTABLE_MAX_AGE = 315360000
+
+def _static_is_immutable(filename):
+    # logo.png is only written at boot, uploads get unique names and the Chart.js
+    # file name carries its version, so none of them ever changes in place
+    return filename in ("logo.png", CHART_JS_FILE) or filename.startswith("uploads/")
+
 @flask_app.route('/static/<path:filename>')
 def static_file(filename):
-    return send_from_directory(str(STATIC_DIR), filename)
+    resp = send_from_directory(str(STATIC_DIR), filename, max_age=86400, conditional=True)
+    if _static_is_immutable(filename):
+        resp.cache_control.max_age = STATIC_IMMUTABLE_MAX_AGE
+        resp.cache_control.immutable = True
+    return resp
+
+# Optional WhiteNoise: files present in static/ at startup are answered by the WSGI
+# middleware (index built once, sendfile-friendly file wrapper) before Flask routing runs.
+# Anything it doesn't know, e.g. photos uploaded after boot, falls through to static_file().
+try:
+    from whitenoise import WhiteNoise
+    flask_app.wsgi_app = WhiteNoise(
+        flask_app.wsgi_app, root=str(STATIC_DIR), prefix="static/", max_age=86400,
+        immutable_file_test=lambda path, url: _static_is_immutable(url[len("/static/"):]),
+    )
+except ImportError:
+    pass
 
 # ---------- health ----------
 @flask_app.route('/health')
@@ -213,201 +460,244 @@ def health():
 # ---------- DB check ----------
 @flask_app.route('/db/check')
 def db_check():
-    ensure_schema()
     con = get_db()
-    try:
-        tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")]
-        return jsonify({"db": str(DB_PATH), "tables": tables})
-    finally:
-        con.close()
+    tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    # effective settings of the pooled connection, to confirm SQLITE_PRAGMAS took hold
+    pragmas = {name: con.execute(f"PRAGMA {name}").fetchone()[0]
+               for name in ("journal_mode", "synchronous", "cache_size", "mmap_size")}
+    return jsonify({"db": str(DB_PATH), "tables": tables, "pragmas": pragmas})
 
 # ---------- NAV ----------
 NAV_BAR = """
 <div class="topnav">
-  <a href="{{ url_for('index') }}">{{ t(lang,'home') }}</a>
-  <a href="{{ url_for('add_record') }}">{{ t(lang,'add') }}</a>
-  <a href="{{ url_for('workers') }}">{{ t(lang,'workers') }}</a>
-  <a href="{{ url_for('tasks') }}">{{ t(lang,'tasks') }}</a>
-  <a href="{{ url_for('monitor') }}">{{ t(lang,'monitor') }}</a>
-  <a href="{{ url_for('advisor') }}">{{ t(lang,'advisor') }}</a>
-  <a href="{{ url_for('clones_home') }}">{{ t(lang,'clones') }}</a>
-  <a href="{{ url_for('db_check') }}">{{ t(lang,'db_check') }}</a>
-  <a href="{{ url_for('ask') }}">{{ t(lang,'ask') }}</a>
-  <span style="float:right;">{{ lang_dropdown|safe }}</span>
+  <a href="{{ url_for('index') }}">{{ L['home'] }}</a>
+  <a href="{{ url_for('add_record') }}">{{ L['add'] }}</a>
+  <a href="{{ url_for('workers') }}">{{ L['workers'] }}</a>
+  <a href="{{ url_for('tasks') }}">{{ L['tasks'] }}</a>
+  <a href="{{ url_for('monitor') }}">{{ L['monitor'] }}</a>
+  <a href="{{ url_for('advisor') }}">{{ L['advisor'] }}</a>
+  <a href="{{ url_for('clones_home') }}">{{ L['clones'] }}</a>
+  <a href="{{ url_for('db_check') }}">{{ L['db_check'] }}</a>
+  <a href="{{ url_for('ask') }}">{{ L['ask'] }}</a>
+  <span style="float:right;">{{ lang_dropdown }}</span>
 </div>
 """
+NAV_BAR_TMPL = flask_app.jinja_env.from_string(NAV_BAR)
+_NAV_BARS = {}
+
+def nav_bar(current):
+    # Same keying as lang_dropdown: the rendered bar is fixed per language and mount
+    # point, so pages splice in a cached Markup string instead of re-running url_for.
+    key = (current, request.script_root)
+    html = _NAV_BARS.get(key)
+    if html is None:
+        html = _NAV_BARS[key] = Markup(NAV_BAR_TMPL.render(L=tr(current), lang_dropdown=lang_dropdown(current)))
+    return html
 
 # ---------- CRUD ----------
+PAGE_SIZE = 50  # dashboard rows per page
+HARVEST_OFFSET = "+63 days"  # flower date -> harvest date (9 weeks), as a SQLite date modifier
+
+# Records CRUD statements. The pooled connection keeps prepared statements in its cache
+# keyed by SQL text, so every route sharing one constant reuses the same compiled plan.
+RECORD_SELECT_SQL = "SELECT id, room, plants, strain, flower_date FROM records WHERE id=?"
+RECORD_INSERT_SQL = "INSERT INTO records(room,plants,strain,flower_date) VALUES(?,?,?,?)"
+RECORD_UPDATE_SQL = "UPDATE records SET room=?, plants=?, strain=?, flower_date=? WHERE id=?"
+RECORD_DELETE_SQL = "DELETE FROM records WHERE id=?"
+RECORD_TOGGLE_PLANNED_SQL = "UPDATE records SET planned = CASE WHEN COALESCE(planned,0) = 1 THEN 0 ELSE 1 END WHERE id=?"
+INDEX_HTML = """
+<html>
+<head>
+  <meta charset="utf-8"><title>{{ L['title'] }}</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <style>
+    body { font-family: Segoe UI, Arial, sans-serif; background:#0e1116; color:#e8e8e8; }
+    a { color:#8fd48f }
+    table { border-collapse: collapse; width:100%; max-width:1250px; background:#11161f }
+    th, td { border:1px solid #2a2f3a; padding:6px 8px; }
+    th { background:#1a1f28; }
+    .container { max-width:1250px; margin: 0 auto; padding: 12px; }
+
+    /* dropdown styles for Plan cell */
+    .dd { position: relative; display: inline-block; }
+    .dd > summary { list-style: none; cursor: pointer; }
+    .dd > summary::-webkit-details-marker { display: none; }
+    .btn-plan {
+      display:inline-block; padding:4px 8px; border:1px solid #2a2f3a;
+      background:#11161f; border-radius:6px; user-select:none;
+    }
+    .dd[open] .btn-plan { outline:1px solid #2a2f3a; }
+    .menu {
+      position:absolute; top:120%; left:0; min-width:180px; z-index:20;
+      background:#0b0f16; border:1px solid #2a2f3a; border-radius:8px; padding:6px;
+      box-shadow: 0 8px 18px rgba(0,0,0,.35);
+    }
+    .menu .menu-item {
+      width:100%; text-align:left; border:0; background:transparent; color:#e8e8e8;
+      padding:8px; border-radius:6px; cursor:pointer;
+    }
+    .menu .menu-item:hover { background:#1a1f28; }
+  </style>
+</head>
+<body>
+  <div class="container">
+    {{ nav_bar }}
+    <h2 style="margin:10px 0;">{{ L['title'] }}</h2>
+    <div style="opacity:.8;font-size:12px;">
+      {{ L['today'] }}: {{ today }}
+      {% if future_only %} • future only (<a href='?future=0'>show all</a>)
+      {% else %} • show all (<a href='?future=1'>future only</a>)
+      {% endif %}
+    </div>
+    <table>
+      <tr>
+        <th>{{ L['room'] }}</th><th>{{ L['plants'] }}</th><th>{{ L['strain'] }}</th>
+        <th>{{ L['flower_date'] }}</th><th>{{ L['harvest_date'] }}</th><th>{{ L['days_remaining'] }}</th>
+        <th>{{ L['plan'] }}</th><th>✏️</th><th>🗑️</th>
+      </tr>
+      {# per-row constants resolved once, not once per record #}
+      {% set plan_label = L['plan'] %}
+      {% for r in rows %}
+      <tr>
+        <td>{{ r.room }}</td><td>{{ r.plants }}</td><td>{{ r.strain }}</td>
+        <td>{{ r.flower_date }}</td><td>{{ r.harvest }}</td><td>{{ r.days }}</td>
+        <td>
+          <details class="dd">
+            <summary class="btn-plan">
+              {{ plan_label }} {% if r.planned %}✓{% endif %}
+            </summary>
+            <div class="menu">
+              <form method="post" action="{{ url_for('toggle_planned', rid=r.id) }}">
+                <button class="menu-item" type="submit">
+                  {% if r.planned %}Unmark Planned ✗{% else %}Mark Planned ✓{% endif %}
+                </button>
+              </form>
+            </div>
+          </details>
+        </td>
+        <td><a href="{{ url_for('edit_record', rid=r.id) }}">✏️</a></td>
+        <td><a href="{{ url_for('delete_record', rid=r.id) }}">🗑️</a></td>
+      </tr>
+      {% endfor %}
+    </table>
+    <div style="margin-top:8px;">
+      {% if has_prev %}<a href="{{ url_for('index', future=1 if future_only else 0, after=rows[0].id) }}">&larr; Prev</a>{% endif %}
+      {% if has_next %}<a href="{{ url_for('index', future=1 if future_only else 0, before=rows[-1].id) }}">Next &rarr;</a>{% endif %}
+    </div>
+  </div>
+</body>
+</html>
+"""
+INDEX_TMPL = flask_app.jinja_env.from_string(INDEX_HTML)
+
 @flask_app.route('/')
 def index():
-    ensure_schema()
-    _ensure_logo()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     future_only = request.args.get("future", "0") == "1"
+    today = date.today()
+    # keyset paging: ?before=<id> is the page after (older rows), ?after=<id> the page
+    # before (newer rows); either way SQLite seeks on the rowid instead of skipping rows
+    before = request.args.get("before", type=int)
+    after = None if before is not None else request.args.get("after", type=int)
 
-    con = get_db()
-    rows = []
-    try:
-        for r in con.execute("""
-            SELECT id, room, plants, strain, flower_date, COALESCE(planned,0) AS planned
-            FROM records ORDER BY id DESC
-        """):
-            rid, room, plants, strain, fd, planned = r
-            try:
-                fdate = datetime.strptime((fd or "").split()[0], "%Y-%m-%d").date()
-            except Exception:
-                fdate = None
-            harvest = fdate + timedelta(weeks=9) if fdate else None
-            if harvest and future_only and harvest < date.today():
-                continue
-            days_rem = (harvest - date.today()).days if harvest else ''
-            rows.append({
-                "id": rid, "room": room, "plants": plants, "strain": strain, "flower_date": fd,
-                "harvest": harvest.isoformat() if harvest else '', "days": days_rem, "planned": int(planned or 0)
-            })
-    finally:
-        con.close()
+    # harvest date and days remaining come straight out of SQLite; "today" is
+    # passed in (not 'now') so it follows the server's local date, not UTC.
+    # Blank harvest/days for unparseable dates, so the sqlite3.Row results can
+    # go to the template as-is (Jinja's r.room falls back to r['room']).
+    harvest = "date(ymd(flower_date), :offset)"
+    sql = ("SELECT id, room, plants, strain, flower_date, COALESCE(planned,0) AS planned,"
+           f" COALESCE({harvest}, '') AS harvest,"
+           f" COALESCE(CAST(julianday({harvest}) - julianday(:today) AS INTEGER), '') AS days"
+           " FROM records")
+    where = []
+    if future_only:
+        # rows without a parseable date are always shown
+        where.append("(harvest = '' OR harvest >= :today)")
+    if before is not None:
+        where.append("id < :before")
+    elif after is not None:
+        where.append("id > :after")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    # one extra row tells us whether there is another page in the walking direction
+    sql += " ORDER BY id " + ("ASC" if after is not None else "DESC") + " LIMIT :limit"
+    params = {"offset": HARVEST_OFFSET, "today": today.isoformat(),
+              "before": before, "after": after, "limit": PAGE_SIZE + 1}
 
-    INDEX_HTML = """
-    <html>
-    <head>
-      <meta charset="utf-8"><title>{{ t(lang,'title') }}</title>
-      <meta name="viewport" content="width=device-width, initial-scale=1">
-      <style>
-        body { font-family: Segoe UI, Arial, sans-serif; background:#0e1116; color:#e8e8e8; }
-        a { color:#8fd48f }
-        table { border-collapse: collapse; width:100%; max-width:1250px; background:#11161f }
-        th, td { border:1px solid #2a2f3a; padding:6px 8px; }
-        th { background:#1a1f28; }
-        .container { max-width:1250px; margin: 0 auto; padding: 12px; }
-
-        /* dropdown styles for Plan cell */
-        .dd { position: relative; display: inline-block; }
-        .dd > summary { list-style: none; cursor: pointer; }
-        .dd > summary::-webkit-details-marker { display: none; }
-        .btn-plan {
-          display:inline-block; padding:4px 8px; border:1px solid #2a2f3a;
-          background:#11161f; border-radius:6px; user-select:none;
-        }
-        .dd[open] .btn-plan { outline:1px solid #2a2f3a; }
-        .menu {
-          position:absolute; top:120%; left:0; min-width:180px; z-index:20;
-          background:#0b0f16; border:1px solid #2a2f3a; border-radius:8px; padding:6px;
-          box-shadow: 0 8px 18px rgba(0,0,0,.35);
-        }
-        .menu .menu-item {
-          width:100%; text-align:left; border:0; background:transparent; color:#e8e8e8;
-          padding:8px; border-radius:6px; cursor:pointer;
-        }
-        .menu .menu-item:hover { background:#1a1f28; }
-      </style>
-    </head>
-    <body>
-      <div class="container">
-        """ + NAV_BAR + """
-        <h2 style="margin:10px 0;">{{ t(lang,'title') }}</h2>
-        <div style="opacity:.8;font-size:12px;">
-          {{ t(lang,'today') }}: {{ today }}
-          {% if future_only %} • future only (<a href='?future=0'>show all</a>)
-          {% else %} • show all (<a href='?future=1'>future only</a>)
-          {% endif %}
-        </div>
-        <table>
-          <tr>
-            <th>{{ t(lang,'room') }}</th><th>{{ t(lang,'plants') }}</th><th>{{ t(lang,'strain') }}</th>
-            <th>{{ t(lang,'flower_date') }}</th><th>{{ t(lang,'harvest_date') }}</th><th>{{ t(lang,'days_remaining') }}</th>
-            <th>{{ t(lang,'plan') }}</th><th>✏️</th><th>🗑️</th>
-          </tr>
-          {% for r in rows %}
-          <tr>
-            <td>{{ r.room }}</td><td>{{ r.plants }}</td><td>{{ r.strain }}</td>
-            <td>{{ r.flower_date }}</td><td>{{ r.harvest }}</td><td>{{ r.days }}</td>
-            <td>
-              <details class="dd">
-                <summary class="btn-plan">
-                  {{ t(lang,'plan') }} {% if r.planned %}✓{% endif %}
-                </summary>
-                <div class="menu">
-                  <form method="post" action="{{ url_for('toggle_planned', rid=r.id) }}">
-                    <button class="menu-item" type="submit">
-                      {% if r.planned %}Unmark Planned ✗{% else %}Mark Planned ✓{% endif %}
-                    </button>
-                  </form>
-                </div>
-              </details>
-            </td>
-            <td><a href="{{ url_for('edit_record', rid=r.id) }}">✏️</a></td>
-            <td><a href="{{ url_for('delete_record', rid=r.id) }}">🗑️</a></td>
-          </tr>
-          {% endfor %}
-        </table>
-      </div>
-    </body>
-    </html>
-    """
-    return render_template_string(
-        INDEX_HTML, rows=rows, lang=lang, t=t, lang_dropdown=lang_dropdown(lang),
-        today=date.today().isoformat(), future_only=future_only
+    con = get_db_ro()
+    fetched = con.execute(sql, params).fetchall()
+    more = len(fetched) > PAGE_SIZE
+    rows = fetched[:PAGE_SIZE]
+    if after is not None:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = before is not None, more
+    return INDEX_TMPL.render(
+        rows=rows, L=tr(lang), nav_bar=nav_bar(lang), today=today.isoformat(),
+        future_only=future_only, has_prev=has_prev and bool(rows), has_next=has_next and bool(rows)
     )
 
 @flask_app.post('/record/<int:rid>/toggle-planned')
 def toggle_planned(rid):
     con = get_db()
-    try:
-        row = con.execute("SELECT COALESCE(planned,0) FROM records WHERE id=?", (rid,)).fetchone()
-        if row is not None:
-            new_val = 0 if int(row[0] or 0) == 1 else 1
-            con.execute("UPDATE records SET planned=? WHERE id=?", (new_val, rid))
-            con.commit()
-    finally:
-        con.close()
-    return redirect(url_for('index'))
+    with con:
+        # flip in one statement: no read round trip, and no window for a lost update
+        con.execute(RECORD_TOGGLE_PLANNED_SQL, (rid,))
+    return redirect(request.referrer or url_for('index'))
+
+ADD_HTML = """
+<html><head><meta charset="utf-8"><title>{{ L['add'] }}</title></head>
+<body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
+<div class="container" style="max-width:720px;margin:20px auto;">{{ nav_bar }}
+<h3>{{ L['add'] }}</h3>
+<form method="post">
+  <div>{{ L['room'] }} <input name="room" required></div>
+  <div>{{ L['plants'] }} <input type="number" name="plants" min="0" required></div>
+  <div>{{ L['strain'] }} <input name="strain"></div>
+  <div>{{ L['flower_date'] }} <input name="flower_date" placeholder="YYYY-MM-DD" required></div>
+  <button type="submit">{{ L['save'] }}</button> <a href="{{ url_for('index') }}">{{ L['back'] }}</a>
+</form>
+</div></body></html>
+"""
+ADD_TMPL = flask_app.jinja_env.from_string(ADD_HTML)
 
 @flask_app.route('/add', methods=['GET','POST'])
 def add_record():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     if request.method == 'POST':
         room = request.form.get('room','').strip()
         plants = int(request.form.get('plants','0') or 0)
         strain = request.form.get('strain','').strip()
         flower_date = request.form.get('flower_date','').strip()
         con = get_db()
-        try:
-            con.execute("INSERT INTO records(room,plants,strain,flower_date) VALUES(?,?,?,?)",
-                        (room, plants, strain, flower_date))
-            con.commit()
-        finally:
-            con.close()
+        with con:
+            con.execute(RECORD_INSERT_SQL, (room, plants, strain, flower_date))
         return redirect(url_for('index'))
 
-    ADD_HTML = """
-    <html><head><meta charset="utf-8"><title>{{ t(lang,'add') }}</title></head>
-    <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
-    <div class="container" style="max-width:720px;margin:20px auto;">""" + NAV_BAR + """
-    <h3>{{ t(lang,'add') }}</h3>
-    <form method="post">
-      <div>{{ t(lang,'room') }} <input name="room" required></div>
-      <div>{{ t(lang,'plants') }} <input type="number" name="plants" min="0" required></div>
-      <div>{{ t(lang,'strain') }} <input name="strain"></div>
-      <div>{{ t(lang,'flower_date') }} <input name="flower_date" placeholder="YYYY-MM-DD" required></div>
-      <button type="submit">{{ t(lang,'save') }}</button> <a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a>
-    </form>
-    </div></body></html>
-    """
-    return render_template_string(ADD_HTML, lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+    return ADD_TMPL.render(L=tr(lang), nav_bar=nav_bar(lang))
+
+EDIT_HTML = """
+<html><head><meta charset="utf-8"><title>✏️</title></head>
+<body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
+<div class="container" style="max-width:720px;margin:20px auto;">{{ nav_bar }}
+<h3>✏️</h3>
+<form method="post">
+  <div>{{ L['room'] }} <input name="room" value="{{ r['room'] }}" required></div>
+  <div>{{ L['plants'] }} <input type="number" name="plants" min="0" value="{{ r['plants'] }}" required></div>
+  <div>{{ L['strain'] }} <input name="strain" value="{{ r['strain'] }}"></div>
+  <div>{{ L['flower_date'] }} <input name="flower_date" placeholder="YYYY-MM-DD" value="{{ r['flower_date'] }}" required></div>
+  <button type="submit">{{ L['save'] }}</button> <a href="{{ url_for('index') }}">{{ L['back'] }}</a>
+</form>
+</div></body></html>
+"""
+EDIT_TMPL = flask_app.jinja_env.from_string(EDIT_HTML)
 
 @flask_app.route('/edit/<int:rid>', methods=['GET','POST'])
 def edit_record(rid):
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     con = get_db()
-    row = None
-    try:
-        cur = con.execute("SELECT id, room, plants, strain, flower_date FROM records WHERE id=?", (rid,))
-        row = cur.fetchone()
-    finally:
-        con.close()
+    row = con.execute(RECORD_SELECT_SQL, (rid,)).fetchone()
     if not row: return redirect(url_for('index'))
 
     if request.method == 'POST':
@@ -415,201 +705,221 @@ def edit_record(rid):
         plants = int(request.form.get('plants','0') or 0)
         strain = request.form.get('strain','').strip()
         flower_date = request.form.get('flower_date','').strip()
-        con = get_db()
-        try:
-            con.execute("UPDATE records SET room=?, plants=?, strain=?, flower_date=? WHERE id=?",
-                        (room, plants, strain, flower_date, rid))
-            con.commit()
-        finally:
-            con.close()
+        with con:
+            con.execute(RECORD_UPDATE_SQL, (room, plants, strain, flower_date, rid))
         return redirect(url_for('index'))
 
-    EDIT_HTML = """
-    <html><head><meta charset="utf-8"><title>✏️</title></head>
-    <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
-    <div class="container" style="max-width:720px;margin:20px auto;">""" + NAV_BAR + """
-    <h3>✏️</h3>
-    <form method="post">
-      <div>{{ t(lang,'room') }} <input name="room" value="{{ r['room'] }}" required></div>
-      <div>{{ t(lang,'plants') }} <input type="number" name="plants" min="0" value="{{ r['plants'] }}" required></div>
-      <div>{{ t(lang,'strain') }} <input name="strain" value="{{ r['strain'] }}"></div>
-      <div>{{ t(lang,'flower_date') }} <input name="flower_date" placeholder="YYYY-MM-DD" value="{{ r['flower_date'] }}" required></div>
-      <button type="submit">{{ t(lang,'save') }}</button> <a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a>
-    </form>
-    </div></body></html>
-    """
-    return render_template_string(EDIT_HTML, r=row, lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+    return EDIT_TMPL.render(r=row, L=tr(lang), nav_bar=nav_bar(lang))
 
 @flask_app.route('/delete/<int:rid>')
 def delete_record(rid):
-    con = get_db(); 
-    try:
-        con.execute("DELETE FROM records WHERE id=?", (rid,))
-        con.commit()
-    finally:
-        con.close()
+    con = get_db()
+    with con:
+        con.execute(RECORD_DELETE_SQL, (rid,))
     return redirect(url_for('index'))
 
 # ---------- Workers ----------
+# Assignee dropdowns (tasks, edit task) reuse one cached worker list; it is
+# re-queried after a DB upload or once anything, in any process, commits to the DB.
+_workers_version = 0
+_workers_cache = {"version": -1, "rows": ()}
+
+def _bump_workers_version():
+    global _workers_version
+    _workers_version += 1
+
+def get_worker_options():
+    version = (_workers_version, db_data_version())
+    if _workers_cache["version"] != version:
+        rows = tuple(get_db_ro().execute("SELECT id,name FROM workers ORDER BY name ASC").fetchall())
+        _workers_cache.update(version=version, rows=rows)
+    return _workers_cache["rows"]
+
+WORKERS_HTML = """
+<html><head><meta charset="utf-8"><title>{{ L['workers'] }}</title></head>
+<body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
+<div class="container" style="max-width:900px;margin:20px auto;">{{ nav_bar }}
+<h3>{{ L['workers'] }}</h3>
+<form method="post" style="display:flex;gap:8px;">
+  <input name="name" placeholder="{{ L['add_worker'] }}">
+  <button type="submit">+</button>
+</form>
+<table style="margin-top:10px;">
+<tr><th>ID</th><th>{{ L['workers'] }}</th></tr>
+{% for r in rows %}<tr><td>{{ r['id'] }}</td><td>{{ r['name'] }}</td></tr>{% endfor %}
+</table>
+<p><a href="{{ url_for('index') }}">{{ L['back'] }}</a></p>
+</div></body></html>
+"""
+WORKERS_TMPL = flask_app.jinja_env.from_string(WORKERS_HTML)
+
 @flask_app.route('/workers', methods=['GET','POST'])
 def workers():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     con = get_db()
     if request.method == 'POST':
         name = request.form.get('name','').strip()
         if name:
             try:
-                con.execute("INSERT INTO workers(name) VALUES(?)", (name,))
-                con.commit()
+                with con:
+                    con.execute("INSERT INTO workers(name) VALUES(?)", (name,))
+                _bump_workers_version()
             except Exception:
                 pass
-    cur = con.execute("SELECT id,name FROM workers ORDER BY id DESC")
-    rows = cur.fetchall()
-    con.close()
+    rows = con.execute("SELECT id,name FROM workers ORDER BY id DESC").fetchall()
 
-    WORKERS_HTML = """
-    <html><head><meta charset="utf-8"><title>{{ t(lang,'workers') }}</title></head>
-    <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
-    <div class="container" style="max-width:900px;margin:20px auto;">""" + NAV_BAR + """
-    <h3>{{ t(lang,'workers') }}</h3>
-    <form method="post" style="display:flex;gap:8px;">
-      <input name="name" placeholder="{{ t(lang,'add_worker') }}">
-      <button type="submit">+</button>
-    </form>
-    <table style="margin-top:10px;">
-    <tr><th>ID</th><th>{{ t(lang,'workers') }}</th></tr>
-    {% for r in rows %}<tr><td>{{ r['id'] }}</td><td>{{ r['name'] }}</td></tr>{% endfor %}
-    </table>
-    <p><a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a></p>
-    </div></body></html>
-    """
-    return render_template_string(WORKERS_HTML, rows=rows, lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+    return WORKERS_TMPL.render(rows=rows, L=tr(lang), nav_bar=nav_bar(lang))
 
 # ---------- Tasks ----------
+TASKS_HTML = """
+<html><head><meta charset="utf-8"><title>{{ L['tasks'] }}</title></head>
+<body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
+<div class="container" style="max-width:1000px;margin:20px auto;">{{ nav_bar }}
+<h3>{{ L['tasks'] }}</h3>
+<form method="post" style="display:grid;grid-template-columns:2fr 1fr 1fr 1fr auto;gap:8px;align-items:center;">
+  <input name="title" placeholder="{{ L['title_label'] }}" required>
+  <select name="assignee_id">
+    <option value="">{{ L['assignee'] }}</option>
+    {% for w in workers %}<option value="{{ w['id'] }}">{{ w['name'] }}</option>{% endfor %}
+  </select>
+  <input name="due_date" placeholder="{{ L['due'] }} (YYYY-MM-DD)">
+  <select name="status">
+    <option value="pending">{{ L['pending'] }}</option>
+    <option value="doing">{{ L['doing'] }}</option>
+    <option value="done">{{ L['done'] }}</option>
+  </select>
+  <button type="submit">{{ L['add_task'] }}</button>
+</form>
+
+<table style="margin-top:12px;">
+<tr><th>ID</th><th>{{ L['title_label'] }}</th><th>{{ L['assignee'] }}</th><th>{{ L['due'] }}</th><th>{{ L['status'] }}</th><th>✏️</th><th>🗑️</th></tr>
+{% for r in rows %}
+<tr>
+  <td>{{ r['id'] }}</td>
+  <td>{{ r['title'] }}</td>
+  <td>{{ r['assignee_name'] or '' }}</td>
+  <td>{{ r['due_date'] or '' }}</td>
+  <td>{{ r['status'] or '' }}</td>
+  <td><a href="{{ url_for('edit_task', tid=r['id']) }}">✏️</a></td>
+  <td><a href="{{ url_for('delete_task', tid=r['id']) }}">🗑️</a></td>
+</tr>
+{% endfor %}
+</table>
+<p><a href="{{ url_for('index') }}">{{ L['back'] }}</a></p>
+</div></body></html>
+"""
+TASKS_TMPL = flask_app.jinja_env.from_string(TASKS_HTML)
+
 @flask_app.route('/tasks', methods=['GET','POST'])
 def tasks():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     con = get_db()
     if request.method == 'POST':
         title = request.form.get('title','').strip()
         assignee_id = request.form.get('assignee_id') or None
         due_date = request.form.get('due_date','').strip() or None
         status = request.form.get('status','pending')
-        con.execute("INSERT INTO tasks(title,assignee_id,due_date,status) VALUES (?,?,?,?)",
-                    (title, assignee_id, due_date, status))
-        con.commit()
+        with con:
+            con.execute("INSERT INTO tasks(title,assignee_id,due_date,status) VALUES (?,?,?,?)",
+                        (title, assignee_id, due_date, status))
     rows = con.execute("""
       SELECT t.id, t.title, t.assignee_id, t.due_date, t.status, w.name as assignee_name
       FROM tasks t LEFT JOIN workers w ON w.id = t.assignee_id
       ORDER BY t.id DESC
     """).fetchall()
-    workers = con.execute("SELECT id,name FROM workers ORDER BY name ASC").fetchall()
-    con.close()
+    workers = get_worker_options()
 
-    TASKS_HTML = """
-    <html><head><meta charset="utf-8"><title>{{ t(lang,'tasks') }}</title></head>
-    <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
-    <div class="container" style="max-width:1000px;margin:20px auto;">""" + NAV_BAR + """
-    <h3>{{ t(lang,'tasks') }}</h3>
-    <form method="post" style="display:grid;grid-template-columns:2fr 1fr 1fr 1fr auto;gap:8px;align-items:center;">
-      <input name="title" placeholder="{{ t(lang,'title_label') }}" required>
-      <select name="assignee_id">
-        <option value="">{{ t(lang,'assignee') }}</option>
-        {% for w in workers %}<option value="{{ w['id'] }}">{{ w['name'] }}</option>{% endfor %}
-      </select>
-      <input name="due_date" placeholder="{{ t(lang,'due') }} (YYYY-MM-DD)">
-      <select name="status">
-        <option value="pending">{{ t(lang,'pending') }}</option>
-        <option value="doing">{{ t(lang,'doing') }}</option>
-        <option value="done">{{ t(lang,'done') }}</option>
-      </select>
-      <button type="submit">{{ t(lang,'add_task') }}</button>
-    </form>
+    return TASKS_TMPL.render(rows=rows, workers=workers, L=tr(lang), nav_bar=nav_bar(lang))
 
-    <table style="margin-top:12px;">
-    <tr><th>ID</th><th>{{ t(lang,'title_label') }}</th><th>{{ t(lang,'assignee') }}</th><th>{{ t(lang,'due') }}</th><th>{{ t(lang,'status') }}</th><th>✏️</th><th>🗑️</th></tr>
-    {% for r in rows %}
-    <tr>
-      <td>{{ r['id'] }}</td>
-      <td>{{ r['title'] }}</td>
-      <td>{{ r['assignee_name'] or '' }}</td>
-      <td>{{ r['due_date'] or '' }}</td>
-      <td>{{ r['status'] or '' }}</td>
-      <td><a href="{{ url_for('edit_task', tid=r['id']) }}">✏️</a></td>
-      <td><a href="{{ url_for('delete_task', tid=r['id']) }}">🗑️</a></td>
-    </tr>
+EDIT_TASK_HTML = """
+<html><head><meta charset="utf-8"><title>✏️ {{ L['tasks'] }}</title></head>
+<body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
+<div class="container" style="max-width:720px;margin:20px auto;">{{ nav_bar }}
+<h3>✏️ {{ L['tasks'] }}</h3>
+<form method="post" style="display:grid;grid-template-columns:2fr 1fr 1fr 1fr;gap:8px;">
+  <input name="title" value="{{ r['title'] }}" required>
+  <select name="assignee_id">
+    <option value="">{{ L['assignee'] }}</option>
+    {% for w in workers %}
+      <option value="{{ w['id'] }}" {% if r['assignee_id']==w['id'] %}selected{% endif %}>{{ w['name'] }}</option>
     {% endfor %}
-    </table>
-    <p><a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a></p>
-    </div></body></html>
-    """
-    return render_template_string(TASKS_HTML, rows=rows, workers=workers, lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+  </select>
+  <input name="due_date" value="{{ r['due_date'] or '' }}">
+  <select name="status">
+    <option value="pending" {% if r['status']=='pending' %}selected{% endif %}>{{ L['pending'] }}</option>
+    <option value="doing" {% if r['status']=='doing' %}selected{% endif %}>{{ L['doing'] }}</option>
+    <option value="done" {% if r['status']=='done' %}selected{% endif %}>{{ L['done'] }}</option>
+  </select>
+  <button type="submit">{{ L['save'] }}</button>
+</form>
+<p><a href="{{ url_for('tasks') }}">{{ L['back'] }}</a></p>
+</div></body></html>
+"""
+EDIT_TASK_TMPL = flask_app.jinja_env.from_string(EDIT_TASK_HTML)
 
 @flask_app.route('/tasks/edit/<int:tid>', methods=['GET','POST'])
 def edit_task(tid):
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     con = get_db()
     r = con.execute("SELECT id,title,assignee_id,due_date,status FROM tasks WHERE id=?", (tid,)).fetchone()
-    workers = con.execute("SELECT id,name FROM workers ORDER BY name ASC").fetchall()
+    workers = get_worker_options()
     if not r:
-        con.close()
         return redirect(url_for('tasks'))
     if request.method == 'POST':
         title = request.form.get('title','').strip()
         assignee_id = request.form.get('assignee_id') or None
         due_date = request.form.get('due_date','').strip() or None
         status = request.form.get('status','pending')
-        con.execute("UPDATE tasks SET title=?, assignee_id=?, due_date=?, status=? WHERE id=?",
-                    (title, assignee_id, due_date, status, tid))
-        con.commit()
-        con.close()
+        with con:
+            con.execute("UPDATE tasks SET title=?, assignee_id=?, due_date=?, status=? WHERE id=?",
+                        (title, assignee_id, due_date, status, tid))
         return redirect(url_for('tasks'))
-    con.close()
 
-    EDIT_TASK_HTML = """
-    <html><head><meta charset="utf-8"><title>✏️ {{ t(lang,'tasks') }}</title></head>
-    <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
-    <div class="container" style="max-width:720px;margin:20px auto;">""" + NAV_BAR + """
-    <h3>✏️ {{ t(lang,'tasks') }}</h3>
-    <form method="post" style="display:grid;grid-template-columns:2fr 1fr 1fr 1fr;gap:8px;">
-      <input name="title" value="{{ r['title'] }}" required>
-      <select name="assignee_id">
-        <option value="">{{ t(lang,'assignee') }}</option>
-        {% for w in workers %}
-          <option value="{{ w['id'] }}" {% if r['assignee_id']==w['id'] %}selected{% endif %}>{{ w['name'] }}</option>
-        {% endfor %}
-      </select>
-      <input name="due_date" value="{{ r['due_date'] or '' }}">
-      <select name="status">
-        <option value="pending" {% if r['status']=='pending' %}selected{% endif %}>{{ t(lang,'pending') }}</option>
-        <option value="doing" {% if r['status']=='doing' %}selected{% endif %}>{{ t(lang,'doing') }}</option>
-        <option value="done" {% if r['status']=='done' %}selected{% endif %}>{{ t(lang,'done') }}</option>
-      </select>
-      <button type="submit">{{ t(lang,'save') }}</button>
-    </form>
-    <p><a href="{{ url_for('tasks') }}">{{ t(lang,'back') }}</a></p>
-    </div></body></html>
-    """
-    return render_template_string(EDIT_TASK_HTML, r=r, workers=workers, lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+    return EDIT_TASK_TMPL.render(r=r, workers=workers, L=tr(lang), nav_bar=nav_bar(lang))
 
 @flask_app.route('/tasks/delete/<int:tid>')
 def delete_task(tid):
     con = get_db()
-    try:
+    with con:
         con.execute("DELETE FROM tasks WHERE id=?", (tid,))
-        con.commit()
-    finally:
-        con.close()
     return redirect(url_for('tasks'))
 
 # ---------- Monitor ----------
+MONITOR_HTML = """
+<html><head><meta charset="utf-8"><title>{{ L['monitor'] }}</title></head>
+<body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
+<div class="container" style="max-width:980px;margin:20px auto;">{{ nav_bar }}
+<h3>{{ L['monitor'] }}</h3>
+<form method="post" style="display:flex;gap:8px;flex-wrap:wrap;">
+  <input name="date" placeholder="YYYY-MM-DD">
+  <input name="room" placeholder="{{ L['room'] }}">
+  <select name="action">
+    <option value="water">{{ L['water'] }}</option>
+    <option value="nutrient">{{ L['nutrient'] }}</option>
+    <option value="ipm">{{ L['ipm'] }}</option>
+    <option value="defol">{{ L['defol'] }}</option>
+  </select>
+  <input name="note" placeholder="{{ L['note'] }}">
+  <button type="submit">+</button>
+</form>
+<table>
+<tr><th>{{ L['week'] }}</th><th>{{ L['room'] }}</th><th>{{ L['action'] }}</th><th>{{ L['note'] }}</th></tr>
+{% for r in rows %}
+<tr><td>{{ r['date'] }}</td><td>{{ r['room'] }}</td><td>{{ r['action'] }}</td><td>{{ r['note'] }}</td></tr>
+{% endfor %}
+</table>
+{% if has_next %}<p><a href="{{ url_for('monitor', before=rows[-1].id) }}">Next &rarr;</a></p>{% endif %}
+<p><a href="{{ url_for('index') }}">{{ L['back'] }}</a></p>
+</div></body></html>
+"""
+MONITOR_TMPL = flask_app.jinja_env.from_string(MONITOR_HTML)
+
+MONITOR_PAGE_SIZE = 200
+MONITOR_SELECT_SQL = "SELECT id, date, room, action, note FROM daily{where} ORDER BY id DESC LIMIT :limit"
+
 @flask_app.route('/monitor', methods=['GET','POST'])
 def monitor():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     con = get_db()
     if request.method == 'POST':
         dt = request.form.get('date', datetime.today().date().isoformat())
@@ -617,74 +927,64 @@ def monitor():
         action = request.form.get('action','').strip()
         note = request.form.get('note','').strip()
         if room and action:
-            con.execute("INSERT INTO daily(date,room,action,note) VALUES(?,?,?,?)",
-                        (dt, room, action, note))
-            con.commit()
-    rows = con.execute("SELECT date,room,action,note FROM daily ORDER BY id DESC LIMIT 200").fetchall()
-    con.close()
+            with con:
+                con.execute("INSERT INTO daily(date,room,action,note) VALUES(?,?,?,?)",
+                            (dt, room, action, note))
+    # keyset paging on the rowid: ?before=<id> seeks straight to the older entries
+    before = request.args.get("before", type=int)
+    sql = MONITOR_SELECT_SQL.format(where=" WHERE id < :before" if before is not None else "")
+    fetched = con.execute(sql, {"before": before, "limit": MONITOR_PAGE_SIZE + 1}).fetchall()
+    rows = fetched[:MONITOR_PAGE_SIZE]
 
-    MONITOR_HTML = """
-    <html><head><meta charset="utf-8"><title>{{ t(lang,'monitor') }}</title></head>
-    <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
-    <div class="container" style="max-width:980px;margin:20px auto;">""" + NAV_BAR + """
-    <h3>{{ t(lang,'monitor') }}</h3>
-    <form method="post" style="display:flex;gap:8px;flex-wrap:wrap;">
-      <input name="date" placeholder="YYYY-MM-DD">
-      <input name="room" placeholder="{{ t(lang,'room') }}">
-      <select name="action">
-        <option value="water">{{ t(lang,'water') }}</option>
-        <option value="nutrient">{{ t(lang,'nutrient') }}</option>
-        <option value="ipm">{{ t(lang,'ipm') }}</option>
-        <option value="defol">{{ t(lang,'defol') }}</option>
-      </select>
-      <input name="note" placeholder="{{ t(lang,'note') }}">
-      <button type="submit">+</button>
-    </form>
-    <table>
-    <tr><th>{{ t(lang,'week') }}</th><th>{{ t(lang,'room') }}</th><th>{{ t(lang,'action') }}</th><th>{{ t(lang,'note') }}</th></tr>
-    {% for r in rows %}
-    <tr><td>{{ r['date'] }}</td><td>{{ r['room'] }}</td><td>{{ r['action'] }}</td><td>{{ r['note'] }}</td></tr>
-    {% endfor %}
-    </table>
-    <p><a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a></p>
-    </div></body></html>
-    """
-    return render_template_string(MONITOR_HTML, rows=rows, lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+    return MONITOR_TMPL.render(rows=rows, has_next=len(fetched) > MONITOR_PAGE_SIZE,
+                               L=tr(lang), nav_bar=nav_bar(lang))
 
 # ---------- Clone Demand ----------
-NINE_WEEKS = 9
+# The table list is read from sqlite_master again only after a DB upload (which bumps
+# _db_generation) or a commit from any process (which moves data_version), not per request.
+_known_tables = {"version": None, "names": frozenset()}
+
 def _table_exists(con, name: str) -> bool:
-    cur = con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (name,))
-    return cur.fetchone() is not None
+    version = (_db_generation, db_data_version())
+    if _known_tables["version"] != version:
+        names = frozenset(r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'"))
+        _known_tables.update(version=version, names=names)
+    return name in _known_tables["names"]
 
-def _parse_date_ymd(s: str):
-    try:
-        return datetime.strptime(str(s).split()[0], "%Y-%m-%d").date()
-    except Exception:
-        return None
+# Bucket each planting into the Monday-starting week of its flower date (the
+# clone week) and total the plants per week. "-6 days, weekday 1" lands on the
+# Monday on or before the date. ymd() is the Python date parser registered on the
+# connection, so the rows left out are exactly those _parse_date_ymd() rejects.
+# The text prefilter only ever over-includes (an unpadded "2026-9-1" sorts after
+# "2026-09-..."), except for values with leading whitespace, which sort below "0".
+CLONE_WEEKS_SQL = """
+SELECT week_start, date(week_start, '+63 days') AS harvest_week, SUM(pl) AS total
+FROM (
+    SELECT date(ymd({col}), '-6 days', 'weekday 1') AS week_start, CAST(plants AS INTEGER) AS pl
+    FROM {table}
+    WHERE {col} >= :since OR {col} < '0'
+)
+WHERE week_start >= :since AND pl != 0
+GROUP BY week_start
+ORDER BY week_start
+"""
 
-def get_clone_source_rows():
-    con = get_db()
-    rows = []
-    try:
-        if _table_exists(con, "records"):
-            for r in con.execute("SELECT flower_date, plants FROM records"):
-                try:
-                    flower = _parse_date_ymd(r["flower_date"]); pl = int(r["plants"] or 0)
-                except Exception:
-                    flower = _parse_date_ymd(r[0]); pl = int(r[1] or 0)
-                if flower and pl: rows.append((flower, pl))
-        elif _table_exists(con, "harvest"):
-            for r in con.execute('SELECT "Flower Date", plants FROM harvest'):
-                flower = _parse_date_ymd(r[0]); pl = int(r[1] or 0)
-                if flower and pl: rows.append((flower, pl))
-    finally:
-        con.close()
-    return rows
+CLONE_WEEKS_RECORDS_SQL = CLONE_WEEKS_SQL.format(table="records", col="flower_date")
+CLONE_WEEKS_HARVEST_SQL = CLONE_WEEKS_SQL.format(table="harvest", col='"Flower Date"')
 
-def compute_clone_demand_grouped(past_weeks: int = 3):
-    raw = get_clone_source_rows()
-    if not raw: return []
+def get_clone_week_totals(since: date):
+    """(week_start, harvest_week, plants) per clone week starting on/after `since`."""
+    con = get_db_ro()
+    # ISO dates compare correctly as text, so the inner range is served by idx_records_flower_date
+    params = {"since": since.isoformat()}
+    if _table_exists(con, "records"):
+        return con.execute(CLONE_WEEKS_RECORDS_SQL, params).fetchall()
+    if _table_exists(con, "harvest"):
+        return con.execute(CLONE_WEEKS_HARVEST_SQL, params).fetchall()
+    return []
+
+def iter_clone_demand(past_weeks: int = 3):
+    """Yield weekly clone-demand rows in week order (see compute_clone_demand_grouped)."""
     today = date.today()
     start_of_this_week = today - timedelta(days=today.weekday())
     try:
@@ -693,29 +993,64 @@ def compute_clone_demand_grouped(past_weeks: int = 3):
         pw = 0
     earliest_week_start = start_of_this_week - timedelta(weeks=max(0, pw))
 
-    buckets = {}
-    for flower_date, plants in raw:
-        harvest = flower_date + timedelta(weeks=NINE_WEEKS)
-        clone_start = harvest - timedelta(weeks=NINE_WEEKS)
-        week_start = clone_start - timedelta(days=clone_start.weekday())
-        if week_start >= earliest_week_start:
-            buckets[week_start] = buckets.get(week_start, 0) + plants
-
-    out = []
-    for wk, total in sorted(buckets.items()):
-        out.append({
-            "week": wk.isoformat(),
-            "harvest_week": (wk + timedelta(weeks=NINE_WEEKS)).isoformat(),
+    for wk, harvest_wk, total in get_clone_week_totals(earliest_week_start):
+        yield {
+            "week": wk,
+            "harvest_week": harvest_wk,
             "plants": int(total),
             "p5":  int(round(total*1.05)),
             "p10": int(round(total*1.10)),
             "p15": int(round(total*1.15)),
             "p20": int(round(total*1.20)),
-        })
-    return out
+        }
+
+# The forecast only changes when the DB does (a commit from any connection or process,
+# or the file being swapped) or when the day rolls over, so the clone pages share one
+# computed result per that key.
+_clone_cache = (None, ())
+
+def _clone_state():
+    return (_db_generation, db_data_version(), date.today().isoformat())
+
+def compute_clone_demand_grouped(past_weeks: int = 3):
+    global _clone_cache
+    key = (*_clone_state(), past_weeks)
+    cached_key, rows = _clone_cache
+    if cached_key != key:
+        rows = tuple(iter_clone_demand(past_weeks))
+        _clone_cache = (key, rows)
+    return rows
+
+# The clone pages are a pure function of the same key plus the language, so they carry a
+# weak ETag and a revalidating browser gets a bare 304 without any query or render.
+# The boot token keeps a restarted process (versions back at 0) from matching old tags.
+_BOOT_TOKEN = os.urandom(4).hex()
+
+def _clone_page_etag(page, lang):
+    return "-".join((page, _BOOT_TOKEN, *map(str, _clone_state()), lang))
+
+# Flask-Compress before 1.19 appends the content coding to every ETag it compresses
+# (W/"tag:gzip"), so that is what the browser sends back.
+_ETAG_CODING_RE = re.compile(r":(?:gzip|br|deflate|zstd)\Z")
+
+def _not_modified(etag):
+    inm = request.if_none_match
+    if inm.star_tag or etag in {_ETAG_CODING_RE.sub("", t) for t in inm.as_set(include_weak=True)}:
+        resp = Response(status=304)
+        resp.set_etag(etag, weak=True)
+        return resp
+    return None
+
+def _with_etag(body, etag):
+    resp = make_response(body)
+    resp.set_etag(etag, weak=True)
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 0
+    resp.vary.add("Cookie")  # the language comes from the lang cookie
+    return resp
 
 CLONES_QUICK_HTML = """
-<!doctype html><html><head><meta charset="utf-8"><title>{{ t(lang,'clone_quick') }}</title>
+<!doctype html><html><head><meta charset="utf-8"><title>{{ L['clone_quick'] }}</title>
 <style>
 body{font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;margin:0}
 .container{max-width:1250px;margin:0 auto;padding:12px}
@@ -725,37 +1060,43 @@ th,td{border:1px solid #2a2f3a;padding:6px 8px;text-align:center}
 th{background:#1a1f28}
 .btn{display:inline-block;padding:6px 10px;background:#294d2b;color:#fff;border-radius:6px}
 </style></head><body>
-  <div class="container">""" + NAV_BAR + """
-    <h2 style="margin:10px 0;">{{ t(lang,'clone_quick') }}</h2>
-    <div style="opacity:0.8;font-size:12px;">{{ t(lang,'today') }}: {{ today }}</div>
+  <div class="container">{{ nav_bar }}
+    <h2 style="margin:10px 0;">{{ L['clone_quick'] }}</h2>
+    <div style="opacity:0.8;font-size:12px;">{{ L['today'] }}: {{ today }}</div>
     <table>
-      <tr><th>{{ t(lang,'clone_week') }}</th><th>+20%</th></tr>
+      <tr><th>{{ L['clone_week'] }}</th><th>+20%</th></tr>
       {% for r in rows %}<tr><td>{{ r.week }}</td><td>{{ r.p20 }}</td></tr>{% endfor %}
     </table>
-    <p><a class="btn" href="{{ url_for('clones_analytics') }}">{{ t(lang,'clone_view_full') }}</a></p>
-    <p><a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a></p>
+    <p><a class="btn" href="{{ url_for('clones_analytics') }}">{{ L['clone_view_full'] }}</a></p>
+    <p><a href="{{ url_for('index') }}">{{ L['back'] }}</a></p>
   </div>
 </body></html>
 """
+CLONES_QUICK_TMPL = flask_app.jinja_env.from_string(CLONES_QUICK_HTML)
 
 @flask_app.route("/clones")
 def clones_home():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
+    etag = _clone_page_etag("quick", lang)
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
     data = []
     try:
         grouped = compute_clone_demand_grouped()
-        for g in grouped:
-            data.append({"week": g["week"], "p20": g["p20"]})
+        for wk in grouped:
+            data.append({"week": wk["week"], "p20": wk["p20"]})
     except Exception as e:
         data = [{"week": "Error", "p20": str(e)}]
-    return render_template_string(CLONES_QUICK_HTML, rows=data, lang=lang, t=t, lang_dropdown=lang_dropdown(lang),
-                                  today=date.today().isoformat())
+        etag = None  # never let a browser revalidate into an error page
+    body = CLONES_QUICK_TMPL.render(rows=data, L=tr(lang), nav_bar=nav_bar(lang),
+                                    today=date.today().isoformat())
+    return _with_etag(body, etag) if etag else body
 
 # Full analytics + chart
 CLONES_ANALYTICS_HTML = """
-<!doctype html><html><head><meta charset="utf-8"><title>{{ t(lang,'clone_full') }}</title>
-<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+<!doctype html><html><head><meta charset="utf-8"><title>{{ L['clone_full'] }}</title>
+<script src="{{ chart_js_src }}"></script>
 <style>
 body{font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;margin:0}
 .container{max-width:1250px;margin:0 auto;padding:12px}
@@ -766,33 +1107,33 @@ th{background:#1a1f28}
 button{cursor:pointer;background:#294d2b;color:#fff;border:none;padding:8px 12px;border-radius:6px}
 canvas{max-width:100%;height:400px}
 </style></head><body>
-  <div class="container">""" + NAV_BAR + """
+  <div class="container">{{ nav_bar }}
     <div style="display:flex;justify-content:space-between;align-items:center;">
-      <h2 style="margin:10px 0;">{{ t(lang,'clone_chart_title') }}</h2>
+      <h2 style="margin:10px 0;">{{ L['clone_chart_title'] }}</h2>
     </div>
     <canvas id="cloneChart"></canvas>
     <script>
-      const labels = {{ labels|safe }};
-      const datasets = {{ datasets|safe }};
+      const labels = {{ labels }};
+      const datasets = {{ datasets }};
       const ctx = document.getElementById('cloneChart');
       new Chart(ctx, {
         type: 'line',
         data: { labels: labels, datasets: datasets },
         options: {
           responsive:true,
-          plugins:{ title:{display:true,text:'{{ t(lang,"clone_chart_title") }}'}, legend:{position:'bottom'} },
-          scales:{ x:{title:{display:true,text:'{{ t(lang,"clone_x") }}'}}, y:{title:{display:true,text:'{{ t(lang,"clone_y") }}'}} }
+          plugins:{ title:{display:true,text:'{{ L['clone_chart_title'] }}'}, legend:{position:'bottom'} },
+          scales:{ x:{title:{display:true,text:'{{ L['clone_x'] }}'}}, y:{title:{display:true,text:'{{ L['clone_y'] }}'}} }
         }
       });
     </script>
 
     <form action="{{ url_for('clones_download') }}" method="get" style="margin:10px 0;">
-      <button type="submit">{{ t(lang,'clone_download') }}</button>
+      <button type="submit">{{ L['clone_download'] }}</button>
     </form>
 
     <table>
       <tr>
-        <th>{{ t(lang,'clone_week') }}</th><th>{{ t(lang,'clone_harvest') }}</th>
+        <th>{{ L['clone_week'] }}</th><th>{{ L['clone_harvest'] }}</th>
         <th>0%</th><th>+5%</th><th>+10%</th><th>+15%</th><th>+20%</th>
       </tr>
       {% for r in rows %}
@@ -802,188 +1143,326 @@ canvas{max-width:100%;height:400px}
         </tr>
       {% endfor %}
     </table>
-    <p><a href="{{ url_for('clones_home') }}">{{ t(lang,'back') }}</a> | <a href="{{ url_for('index') }}">{{ t(lang,'title') }}</a></p>
+    <p><a href="{{ url_for('clones_home') }}">{{ L['back'] }}</a> | <a href="{{ url_for('index') }}">{{ L['title'] }}</a></p>
   </div>
 </body></html>
 """
+CLONES_ANALYTICS_TMPL = flask_app.jinja_env.from_string(CLONES_ANALYTICS_HTML)
+
+def _script_json(obj):
+    """Serialise obj for inlining in a <script> block, escaped the same way as Jinja's |tojson."""
+    s = orjson.dumps(obj).decode() if orjson is not None else json.dumps(obj, separators=(",", ":"))
+    return Markup(s.replace("<", "\\u003c").replace(">", "\\u003e")
+                   .replace("&", "\\u0026").replace("'", "\\u0027"))
+
+# (legend, row key, line colour) for each forecast line on the analytics chart
+CLONE_CHART_SERIES = (
+    ("0%", "plants", "blue"),
+    ("+5%", "p5", "green"),
+    ("+10%", "p10", "orange"),
+    ("+15%", "p15", "purple"),
+    ("+20%", "p20", "red"),
+)
 
 @flask_app.route("/clones/analytics")
 def clones_analytics():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
+    etag = _clone_page_etag("analytics", lang)
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
     rows = []
     labels = []
     datasets = []
     try:
-        grouped = compute_clone_demand_grouped()
-        for g in grouped:
+        # one pass over the weeks fills the table rows, the labels and every series
+        series = {key: [] for _, key, _ in CLONE_CHART_SERIES}
+        for wk in compute_clone_demand_grouped():
             rows.append({
-                "week": g["week"],
-                "harvest": g["harvest_week"],
-                "plants": g["plants"], "p5": g["p5"], "p10": g["p10"], "p15": g["p15"], "p20": g["p20"]
+                "week": wk["week"],
+                "harvest": wk["harvest_week"],
+                "plants": wk["plants"], "p5": wk["p5"], "p10": wk["p10"], "p15": wk["p15"], "p20": wk["p20"]
             })
-        labels = [r["week"] for r in rows]
-        datasets = [
-            {"label":"0%","data":[r["plants"] for r in rows],"borderColor":"blue","fill":False},
-            {"label":"+5%","data":[r["p5"] for r in rows],"borderColor":"green","fill":False},
-            {"label":"+10%","data":[r["p10"] for r in rows],"borderColor":"orange","fill":False},
-            {"label":"+15%","data":[r["p15"] for r in rows],"borderColor":"purple","fill":False},
-            {"label":"+20%","data":[r["p20"] for r in rows],"borderColor":"red","fill":False},
-        ]
+            labels.append(wk["week"])
+            for key, data in series.items():
+                data.append(wk[key])
+        datasets = [{"label": label, "data": series[key], "borderColor": color, "fill": False}
+                    for label, key, color in CLONE_CHART_SERIES]
     except Exception as e:
         rows = [{"week":"Error","harvest":str(e),"plants":"","p5":"","p10":"","p15":"","p20":""}]
         labels = []; datasets = []
-    return render_template_string(CLONES_ANALYTICS_HTML, rows=rows, labels=labels, datasets=datasets,
-                                  lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+        etag = None  # never let a browser revalidate into an error page
+    chart_js_src = url_for('static_file', filename=CHART_JS_FILE) if CHART_JS_LOCAL else CHART_JS_CDN
+    body = CLONES_ANALYTICS_TMPL.render(rows=rows, labels=_script_json(labels), datasets=_script_json(datasets),
+                                        chart_js_src=chart_js_src, L=tr(lang), nav_bar=nav_bar(lang))
+    return _with_etag(body, etag) if etag else body
 
 @flask_app.route("/clones/download.csv")
 def clones_download():
-    ensure_schema()
-    rows = compute_clone_demand_grouped()
-    import io, csv
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["clone_week","harvest_week","plants","p5","p10","p15","p20"])
-    for r in rows:
-        writer.writerow([r["week"], r["harvest_week"], r["plants"], r["p5"], r["p10"], r["p15"], r["p20"]])
-    resp = make_response(output.getvalue())
-    resp.headers["Content-Type"] = "text/csv"
-    resp.headers["Content-Disposition"] = "attachment; filename=clone_forecast.csv"
-    return resp
+    def generate():
+        # every field is an ISO date from SQLite's date() or an int, so nothing ever needs
+        # CSV quoting: format each row straight into the line that is sent to the client
+        yield "clone_week,harvest_week,plants,p5,p10,p15,p20\r\n"
+        for r in compute_clone_demand_grouped():
+            yield f'{r["week"]},{r["harvest_week"]},{r["plants"]},{r["p5"]},{r["p10"]},{r["p15"]},{r["p20"]}\r\n'
+
+    return Response(stream_with_context(generate()), mimetype="text/csv",
+                    headers={"Content-Disposition": "attachment; filename=clone_forecast.csv"})
 
 # ---------- Advisor (with local heuristic fallback) ----------
+@lru_cache(maxsize=1)
+def get_openai_client():
+    # built once per process: the SDK client is thread-safe and reuses its HTTP/TLS pool.
+    # Imported here rather than at module top: the SDK is slow to load and most
+    # deployments run without a key, so they never pay for it.
+    from openai import OpenAI
+    # The SDK defaults to a 10-minute timeout with two retries; cap it so a stalled API call
+    # can't pin a request thread (and the local answer is returned instead).
+    return OpenAI(api_key=os.environ['OPENAI_API_KEY'],
+                  timeout=float(os.environ.get('OPENAI_TIMEOUT', '20')), max_retries=1)
+
+# Week-by-week tips per feed program (weeks 1..10); tuples, so threads share them read-only.
+ADVISOR_PLANS = {
+    "athena":(
+        "Transplant support, low EC 1.6–1.8, silica light, no heavy PK.",
+        "Ramp EC 1.8–2.1, maintain Ca/Mg, monitor runoff.",
+        "EC 2.0–2.2; maintain VPD 1.1–1.3; early defoliate if dense.",
+        "Hold EC ~2.2; introduce slight PK bump; watch tip burn.",
+        "PK push begins; EC 2.2–2.4; ensure drain 10–20%.",
+        "Peak PK; watch K/Ca balance; keep pH 5.7–6.1 (hydro) / 5.9–6.3 (coco).",
+        "Begin taper 5–10%; reduce N; maintain K and Mg.",
+        "Further taper; prep flush strategy; IPM only if needed.",
+        "Flush or low EC; finishers only; reduce humidity to avoid mold.",
+        "Harvest window; keep temps lower at night; darkness optional."
+    ),
+    "salts":(
+        "Low EC start 1.6–1.8; Ca/Mg 150–200 ppm; silica minimal.",
+        "EC 1.9–2.1; keep N:P:K balanced; record runoff.",
+        "EC 2.0–2.2; watch deficiency; increase airflow.",
+        "Hold EC ~2.2; slight PK; ensure distribution.",
+        "Increase PK; EC 2.2–2.4; avoid overwatering.",
+        "Peak PK; ensure sulfur for terps; monitor leaves.",
+        "Start taper 5–10%; lower N; keep K steady.",
+        "Taper more; watch fade; avoid late N spikes.",
+        "Flush/finishers; target runoff EC ~ input.",
+        "Harvest; avoid foliar; prep dry room."
+    )
+}
+
+# Keywords in the grower's notes -> index of the extra tip they trigger; one regex
+# pass finds them all, and each tip is emitted once, in _ADVISOR_EXTRAS order.
+_ADVISOR_NOTE_PAT = re.compile(r"burn|pale|yellow|lockout|high ec")
+_ADVISOR_KEYWORDS = {"burn": 0, "pale": 1, "yellow": 1, "lockout": 2, "high ec": 2}
+_ADVISOR_EXTRAS = (
+    "\n• Tip burn: drop EC by 0.2–0.3, increase runoff to ~20%.",
+    "\n• Pale leaves: check N & Mg, add 30–50 ppm Mg.",
+    "\n• Lockout: reset low EC feed; verify pH/runoff.",
+)
+
 def local_heuristic_advice(program: str, week: int, notes: str) -> str:
     w = max(1, min(int(week or 1), 10))
-    base = {
-        "athena":[
-            "Transplant support, low EC 1.6–1.8, silica light, no heavy PK.",
-            "Ramp EC 1.8–2.1, maintain Ca/Mg, monitor runoff.",
-            "EC 2.0–2.2; maintain VPD 1.1–1.3; early defoliate if dense.",
-            "Hold EC ~2.2; introduce slight PK bump; watch tip burn.",
-            "PK push begins; EC 2.2–2.4; ensure drain 10–20%.",
-            "Peak PK; watch K/Ca balance; keep pH 5.7–6.1 (hydro) / 5.9–6.3 (coco).",
-            "Begin taper 5–10%; reduce N; maintain K and Mg.",
-            "Further taper; prep flush strategy; IPM only if needed.",
-            "Flush or low EC; finishers only; reduce humidity to avoid mold.",
-            "Harvest window; keep temps lower at night; darkness optional."
-        ],
-        "salts":[
-            "Low EC start 1.6–1.8; Ca/Mg 150–200 ppm; silica minimal.",
-            "EC 1.9–2.1; keep N:P:K balanced; record runoff.",
-            "EC 2.0–2.2; watch deficiency; increase airflow.",
-            "Hold EC ~2.2; slight PK; ensure distribution.",
-            "Increase PK; EC 2.2–2.4; avoid overwatering.",
-            "Peak PK; ensure sulfur for terps; monitor leaves.",
-            "Start taper 5–10%; lower N; keep K steady.",
-            "Taper more; watch fade; avoid late N spikes.",
-            "Flush/finishers; target runoff EC ~ input.",
-            "Harvest; avoid foliar; prep dry room."
-        ]
-    }
-    table = base["athena" if program=="athena" else "salts"]
+    table = ADVISOR_PLANS["athena" if program=="athena" else "salts"]
     tip = table[w-1]
     extra = ""
     if notes:
-        n = notes.lower()
-        if "burn" in n: extra += "\n• Tip burn: drop EC by 0.2–0.3, increase runoff to ~20%."
-        if "pale" in n or "yellow" in n: extra += "\n• Pale leaves: check N & Mg, add 30–50 ppm Mg."
-        if "lockout" in n or "high ec" in n: extra += "\n• Lockout: reset low EC feed; verify pH/runoff."
+        hits = {_ADVISOR_KEYWORDS[k] for k in _ADVISOR_NOTE_PAT.findall(notes.lower())}
+        extra = "".join(_ADVISOR_EXTRAS[i] for i in sorted(hits))
     return f"Program: {program.capitalize()} | Week {w}\n{tip}{extra}"
 
+ADVISOR_HTML = """
+<!doctype html><html><head><meta charset="utf-8"><title>{{ L['advisor_title'] }}</title>
+<style>
+body{font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;margin:0}
+.container{max-width:900px;margin:0 auto;padding:12px}
+label{display:block;margin:8px 0 4px 0}
+input,select,textarea{width:100%;padding:8px;border:1px solid #2a2f3a;background:#11161f;color:#e8e8e8;border-radius:6px}
+button{margin-top:10px;padding:8px 12px;border:0;background:#294d2b;color:#fff;border-radius:6px;cursor:pointer}
+a{color:#8fd48f}
+</style></head><body>
+  <div class="container">{{ nav_bar }}
+    <h2>{{ L['advisor_title'] }}</h2>
+    <p>{{ L['advisor_desc'] }}</p>
+    <form method="post">
+      <label>{{ L['program'] }}</label>
+      <select name="program"><option value="athena">{{ L['athena'] }}</option><option value="salts">{{ L['salts'] }}</option></select>
+      <label>{{ L['week'] }}</label><input name="week" type="number" min="1" max="10" value="1">
+      <label>{{ L['notes'] }}</label><textarea name="notes" rows="3" placeholder="{{ L['notes'] }}"></textarea>
+      <button type="submit">{{ L['submit'] }}</button>
+    </form>
+    <div id="answer-box"{% if not answer %} style="display:none"{% endif %}><hr><pre id="answer" style="white-space:pre-wrap">{{ answer or '' }}</pre></div>
+    {% if stream %}
+    <script>
+      // With a key configured, stream the reply token by token over SSE; without
+      // EventSource the form still falls back to a normal POST.
+      const form = document.querySelector('form[method=post]');
+      if (window.EventSource) form.addEventListener('submit', function (ev) {
+        ev.preventDefault();
+        const out = document.getElementById('answer');
+        out.textContent = '';
+        document.getElementById('answer-box').style.display = '';
+        const es = new EventSource("{{ url_for('advisor_stream') }}?" + new URLSearchParams(new FormData(form)));
+        es.onmessage = function (e) { out.textContent += JSON.parse(e.data); };
+        es.addEventListener('done', function () { es.close(); });
+        es.onerror = function () { es.close(); };
+      });
+    </script>
+    {% endif %}
+    <p><a href="{{ url_for('index') }}">{{ L['back'] }}</a></p>
+  </div>
+</body></html>
+"""
+ADVISOR_TMPL = flask_app.jinja_env.from_string(ADVISOR_HTML)
+
 @flask_app.route('/advisor', methods=['GET','POST'])
 def advisor():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     answer = None
     if request.method == 'POST':
         program = request.form.get('program','athena')
         week = int(request.form.get('week','1') or 1)
         notes = request.form.get('notes','')
         answer = local_heuristic_advice(program, week, notes)
-        if OPENAI_AVAILABLE and os.environ.get('OPENAI_API_KEY'):
+        if os.environ.get('OPENAI_API_KEY'):
             try:
-                client = OpenAI(api_key=os.environ['OPENAI_API_KEY'])
-                prompt = f"Give concise nutrient actions for cannabis flower Week {week} using {program}. Context: {notes}."
-                resp = client.responses.create(model=os.environ.get('OPENAI_MODEL','gpt-4o-mini'), input=prompt)
+                client = get_openai_client()
+                resp = client.responses.create(model=os.environ.get('OPENAI_MODEL','gpt-4o-mini'),
+                                               input=_advisor_prompt(program, week, notes))
                 answer = resp.output_text.strip()
+            except ImportError:
+                pass  # openai package not installed: keep the local answer
             except Exception as e:
                 answer = answer + "\n\n(OpenAI fallback: " + str(e) + ")"
-    ADVISOR_HTML = """
-    <!doctype html><html><head><meta charset="utf-8"><title>{{ t(lang,'advisor_title') }}</title>
-    <style>
-    body{font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;margin:0}
-    .container{max-width:900px;margin:0 auto;padding:12px}
-    label{display:block;margin:8px 0 4px 0}
-    input,select,textarea{width:100%;padding:8px;border:1px solid #2a2f3a;background:#11161f;color:#e8e8e8;border-radius:6px}
-    button{margin-top:10px;padding:8px 12px;border:0;background:#294d2b;color:#fff;border-radius:6px;cursor:pointer}
-    a{color:#8fd48f}
-    </style></head><body>
-      <div class="container">""" + NAV_BAR + """
-        <h2>{{ t(lang,'advisor_title') }}</h2>
-        <p>{{ t(lang,'advisor_desc') }}</p>
-        <form method="post">
-          <label>{{ t(lang,'program') }}</label>
-          <select name="program"><option value="athena">{{ t(lang,'athena') }}</option><option value="salts">{{ t(lang,'salts') }}</option></select>
-          <label>{{ t(lang,'week') }}</label><input name="week" type="number" min="1" max="10" value="1">
-          <label>{{ t(lang,'notes') }}</label><textarea name="notes" rows="3" placeholder="{{ t(lang,'notes') }}"></textarea>
-          <button type="submit">{{ t(lang,'submit') }}</button>
-        </form>
-        {% if answer %}<hr><pre style="white-space:pre-wrap">{{ answer }}</pre>{% endif %}
-        <p><a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a></p>
-      </div>
-    </body></html>
-    """
-    return render_template_string(ADVISOR_HTML, answer=answer, lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+    return ADVISOR_TMPL.render(answer=answer, stream=bool(os.environ.get('OPENAI_API_KEY')),
+                               L=tr(lang), nav_bar=nav_bar(lang))
+
+def _advisor_prompt(program, week, notes):
+    return f"Give concise nutrient actions for cannabis flower Week {week} using {program}. Context: {notes}."
+
+def _sse(text):
+    # JSON-encode each chunk so newlines inside it can't break the event framing
+    return "data: " + json.dumps(text, ensure_ascii=False) + "\n\n"
+
+@flask_app.route('/advisor/stream')
+def advisor_stream():
+    """Server-sent events version of the advisor POST: the reply arrives as it is generated."""
+    program = request.args.get('program', 'athena')
+    week = request.args.get('week', 1, type=int) or 1
+    notes = request.args.get('notes', '')
+
+    def generate():
+        local = local_heuristic_advice(program, week, notes)
+        sent = False
+        try:
+            if os.environ.get('OPENAI_API_KEY'):
+                client = get_openai_client()
+                events = client.responses.create(model=os.environ.get('OPENAI_MODEL','gpt-4o-mini'),
+                                                 input=_advisor_prompt(program, week, notes), stream=True)
+                for event in events:
+                    if event.type == "response.output_text.delta" and event.delta:
+                        sent = True
+                        yield _sse(event.delta)
+            else:
+                yield _sse(local)
+        except ImportError:
+            yield _sse(local)  # openai package not installed
+        except Exception as e:
+            if not sent:
+                yield _sse(local)
+            yield _sse("\n\n(OpenAI fallback: " + str(e) + ")")
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # ---------- DB upload (maintenance) ----------
+DB_HTML = """
+<html><head><meta charset="utf-8"><title>{{ L['db_check'] }}</title></head>
+<body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
+<div class="container" style="max-width:900px;margin:20px auto;">{{ nav_bar }}
+<h3>{{ L['db_upload'] }}</h3>
+{% if msg %}<p>{{ msg }}</p>{% endif %}
+<form method="post" enctype="multipart/form-data">
+  <input type="file" name="file" accept=".db"><button type="submit">{{ L['upload'] }}</button>
+</form>
+<p>DB: {{ db }}</p>
+<p><a href="{{ url_for('index') }}">{{ L['back'] }}</a></p>
+</div></body></html>
+"""
+DB_TMPL = flask_app.jinja_env.from_string(DB_HTML)
+
 @flask_app.route('/db/upload', methods=['GET','POST'])
 def upload_db():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     msg = None
     if request.method == 'POST':
         f = request.files.get('file')
         if f and f.filename.lower().endswith('.db'):
-            data = f.read()
             DB_DIR.mkdir(parents=True, exist_ok=True)
-            with open(DB_PATH, 'wb') as out:
-                out.write(data)
+            # Write beside the live DB and swap it in atomically; pooled connections
+            # still hold the old file, so drop them and its WAL/SHM sidecars.
+            tmp_path = DB_PATH.with_name(DB_PATH.name + ".upload")
+            # copy straight from the upload stream in 1 MiB chunks rather than reading the
+            # whole DB into memory; fsync so the file is on disk before it replaces the live one
+            with open(tmp_path, 'wb') as out:
+                shutil.copyfileobj(f.stream, out, length=1024 * 1024)
+                out.flush()
+                os.fsync(out.fileno())
+            _reset_db_connections()
+            for sidecar in ("-wal", "-shm"):
+                try:
+                    os.remove(str(DB_PATH) + sidecar)
+                except FileNotFoundError:
+                    pass
+            os.replace(tmp_path, DB_PATH)
+            ensure_schema()
+            _bump_workers_version()
             msg = 'Uploaded.'
         else:
             msg = 'Invalid file.'
-    DB_HTML = """
-    <html><head><meta charset="utf-8"><title>{{ t(lang,'db_check') }}</title></head>
-    <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;">
-    <div class="container" style="max-width:900px;margin:20px auto;">""" + NAV_BAR + """
-    <h3>{{ t(lang,'db_upload') }}</h3>
-    {% if msg %}<p>{{ msg }}</p>{% endif %}
-    <form method="post" enctype="multipart/form-data">
-      <input type="file" name="file" accept=".db"><button type="submit">{{ t(lang,'upload') }}</button>
-    </form>
-    <p>DB: {{ db }}</p>
-    <p><a href="{{ url_for('index') }}">{{ t(lang,'back') }}</a></p>
-    </div></body></html>
-    """
-    return render_template_string(DB_HTML, msg=msg, db=str(DB_PATH), lang=lang, t=t, lang_dropdown=lang_dropdown(lang))
+    return DB_TMPL.render(msg=msg, db=str(DB_PATH), L=tr(lang), nav_bar=nav_bar(lang))
 
 # ---------- Ask (Image) ----------
-from werkzeug.utils import secure_filename
-QA_LOG = DB_DIR / "qa_log.json"
-def _qa_read():
+# Append-only JSON Lines, oldest first: a question costs one small O_APPEND write instead
+# of re-reading and rewriting the whole log, and concurrent posts can't drop each other.
+QA_LOG = DB_DIR / "qa_log.jsonl"
+QA_LOG_LEGACY = DB_DIR / "qa_log.json"  # pre-JSONL format: one JSON list, newest first
+
+def _qa_migrate_legacy():
+    if QA_LOG.exists() or not QA_LOG_LEGACY.exists():
+        return
     try:
-        if QA_LOG.exists():
-            return json.loads(QA_LOG.read_text(encoding='utf-8'))
+        entries = json.loads(QA_LOG_LEGACY.read_text(encoding='utf-8'))
+        tmp = QA_LOG.with_suffix(".jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in reversed(entries):
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, QA_LOG)
     except Exception:
         pass
-    return []
-def _qa_write(entries):
+
+_qa_migrate_legacy()
+
+def _qa_append(entry):
     try:
-        QA_LOG.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding='utf-8')
+        with open(QA_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
     except Exception:
         pass
 
+def _qa_iter():
+    # oldest first, one line at a time; a torn last line is skipped rather than failing the page
+    try:
+        with open(QA_LOG, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        return
+
 ASK_HTML = """
-<!doctype html><html><head><meta charset="utf-8"><title>{{ t(lang,'ask') }}</title>
+<!doctype html><html><head><meta charset="utf-8"><title>{{ L['ask'] }}</title>
 <style>
 body{font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;margin:0}
 .container{max-width:760px;margin:0 auto;padding:14px}
@@ -994,40 +1473,42 @@ button{cursor:pointer;background:#294d2b;color:#fff;border:none;padding:10px 14p
 img.thumb{max-width:100%;height:auto;border-radius:8px;border:1px solid #2a2f3a}
 </style></head><body>
   <div class="container">
-    """ + NAV_BAR + """
-    <h2 style="margin:10px 0;">{{ t(lang,'ask') }}</h2>
+    {{ nav_bar }}
+    <h2 style="margin:10px 0;">{{ L['ask'] }}</h2>
     <form method="post" enctype="multipart/form-data">
-      <label>{{ t(lang,'question') }}</label>
-      <textarea name="question" rows="4" placeholder="{{ t(lang,'question') }}" required></textarea>
+      <label>{{ L['question'] }}</label>
+      <textarea name="question" rows="4" placeholder="{{ L['question'] }}" required></textarea>
       <div style="display:flex;gap:10px">
         <input name="name" placeholder="Name (optional)" style="flex:1">
         <input name="room" placeholder="Room (optional)" style="flex:1">
       </div>
-      <label>{{ t(lang,'upload_image') }} <span class="help">(PNG, JPG, GIF, WEBP; up to 10 MB)</span></label>
+      <label>{{ L['upload_image'] }} <span class="help">(PNG, JPG, GIF, WEBP; up to 10 MB)</span></label>
       <input type="file" name="image" accept="image/*">
-      <button type="submit">{{ t(lang,'submit') }}</button>
+      <button type="submit">{{ L['submit'] }}</button>
     </form>
     <p class="help">Tip: include flower week, strain, recent actions, and runoff EC/pH.</p>
-    <p><a href="{{ url_for('ask_inbox') }}">{{ t(lang,'inbox') }}</a> · <a href="{{ url_for('index') }}">{{ t(lang,'title') }}</a></p>
+    <p><a href="{{ url_for('ask_inbox') }}">{{ L['inbox'] }}</a> · <a href="{{ url_for('index') }}">{{ L['title'] }}</a></p>
   </div>
 </body></html>
 """
+ASK_TMPL = flask_app.jinja_env.from_string(ASK_HTML)
 
 THANKS_HTML = """
-<!doctype html><html><head><meta charset="utf-8"><title>{{ t(lang,'thanks') }}</title></head>
+<!doctype html><html><head><meta charset="utf-8"><title>{{ L['thanks'] }}</title></head>
 <body style="font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;margin:0">
-  <div class="container" style="max-width:760px;margin:0 auto;padding:14px">""" + NAV_BAR + """
-    <h2 style="margin:10px 0;">{{ t(lang,'thanks') }}</h2>
+  <div class="container" style="max-width:760px;margin:0 auto;padding:14px">{{ nav_bar }}
+    <h2 style="margin:10px 0;">{{ L['thanks'] }}</h2>
     {% if entry.image_url %}<img class="thumb" src="{{ entry.image_url }}" alt="Uploaded image">{% endif %}
     <h4>Question</h4><p>{{ entry.question }}</p>
     <p style="font-size:12px;color:#97a3b6">ID: {{ entry.id }} · {{ entry.ts }}</p>
-    <p><a href="{{ url_for('ask_inbox') }}">{{ t(lang,'inbox') }}</a> · <a href="{{ url_for('index') }}">{{ t(lang,'title') }}</a></p>
+    <p><a href="{{ url_for('ask_inbox') }}">{{ L['inbox'] }}</a> · <a href="{{ url_for('index') }}">{{ L['title'] }}</a></p>
   </div>
 </body></html>
 """
+THANKS_TMPL = flask_app.jinja_env.from_string(THANKS_HTML)
 
 INBOX_HTML = """
-<!doctype html><html><head><meta charset="utf-8"><title>{{ t(lang,'inbox') }}</title>
+<!doctype html><html><head><meta charset="utf-8"><title>{{ L['inbox'] }}</title>
 <style>
 body{font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;margin:0}
 .container{max-width:1100px;margin:0 auto;padding:14px}
@@ -1035,8 +1516,8 @@ body{font-family:Segoe UI,Arial,sans-serif;background:#0e1116;color:#e8e8e8;marg
 img.thumb{max-width:280px;height:auto;border-radius:8px;border:1px solid #2a2f3a}
 .meta{font-size:12px;color:#97a3b6}
 </style></head><body>
-  <div class="container">""" + NAV_BAR + """
-    <h2 style="margin:10px 0;">{{ t(lang,'inbox') }}</h2>
+  <div class="container">{{ nav_bar }}
+    <h2 style="margin:10px 0;">{{ L['inbox'] }}</h2>
     {% for e in entries %}
       <div class="card">
         <div class="meta">{{ e.ts }} · {{ e.name or 'Anon' }} · Room {{ e.room or '-' }} · ID {{ e.id }}</div>
@@ -1044,45 +1525,50 @@ img.thumb{max-width:280px;height:auto;border-radius:8px;border:1px solid #2a2f3a
         <p>{{ e.question }}</p>
       </div>
     {% else %}<p class="meta">No entries yet.</p>{% endfor %}
-    <p><a href="{{ url_for('index') }}">{{ t(lang,'title') }}</a></p>
+    <p><a href="{{ url_for('index') }}">{{ L['title'] }}</a></p>
   </div>
 </body></html>
 """
+INBOX_TMPL = flask_app.jinja_env.from_string(INBOX_HTML)
 
 @flask_app.route("/ask", methods=["GET","POST"])
 def ask():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
+    lang = g.lang
     if request.method == "POST":
         q = request.form.get("question","").strip()
         name = request.form.get("name","").strip()
         room = request.form.get("room","").strip()
         img = request.files.get("image")
         image_url = ""
-        if img and img.filename and allowed_file(img.filename):
-            import time, uuid
-            fn = secure_filename(img.filename)
-            ext = fn.rsplit(".",1)[1].lower()
-            new_fn = f"{int(time.time())}_{str(uuid.uuid4())[:8]}.{ext}"
-            save_path = UPLOAD_DIR / new_fn
-            img.save(save_path)
+        ext = upload_ext(img.filename) if img and img.filename else None
+        if ext:
+            # "x" refuses to overwrite, so a name collision picks a new name instead of
+            # replacing another submission's photo
+            while True:
+                new_fn = f"{int(time.time())}_{os.urandom(4).hex()}.{ext}"
+                try:
+                    with open(UPLOAD_DIR / new_fn, "xb") as fp:
+                        img.save(fp)
+                except FileExistsError:
+                    continue
+                break
             image_url = "/static/uploads/" + new_fn
         entry = {
-            "id": datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+            "id": format(time.time_ns(), "x"),  # practically unique per submission, unlike a per-second stamp
             "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "name": name, "room": room,
             "question": q, "image_url": image_url
         }
-        entries = _qa_read(); entries.insert(0, entry); _qa_write(entries)
-        return render_template_string(THANKS_HTML, entry=entry, t=t, lang=lang, lang_dropdown=lang_dropdown(lang))
-    return render_template_string(ASK_HTML, t=t, lang=lang, lang_dropdown=lang_dropdown(lang))
+        _qa_append(entry)
+        return THANKS_TMPL.render(entry=entry, L=tr(lang), nav_bar=nav_bar(lang))
+    return ASK_TMPL.render(L=tr(lang), nav_bar=nav_bar(lang))
 
 @flask_app.route("/ask/inbox")
 def ask_inbox():
-    ensure_schema()
-    lang = request.cookies.get("lang", "en")
-    entries = _qa_read()
-    return render_template_string(INBOX_HTML, entries=entries, t=t, lang=lang, lang_dropdown=lang_dropdown(lang))
+    lang = g.lang
+    entries = list(_qa_iter())
+    entries.reverse()  # newest first
+    return INBOX_TMPL.render(entries=entries, L=tr(lang), nav_bar=nav_bar(lang))
 
 # ---------- Run ----------
 if __name__ == "__main__":
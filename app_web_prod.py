@@ -1,11 +1,16 @@
 import os
 import json
 import sqlite3
+import threading
 from pathlib import Path
 from flask import Flask, jsonify, render_template, request, redirect, url_for, flash, send_file
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
+# Behind nginx/Apache, let the front server stream file downloads (X-Sendfile);
+# otherwise send_file() hands the open file to the WSGI server's file_wrapper.
+# Flask 3 reads this from config only; the old app.use_x_sendfile attribute is gone.
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE") == "1"
 
 # =========================================================
 # 1) Persistent storage & database configuration
@@ -35,16 +40,44 @@ LOG_FILE  = os.path.join(DB_DIR, "app_log.txt")
 # =========================================================
 # 2) Helpers
 # =========================================================
+# This service only reads the DB, so each worker thread keeps one connection open
+# for its lifetime instead of reconnecting (and re-warming the page cache) per request.
+SQLITE_PRAGMAS = """
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-20000;
+PRAGMA mmap_size=268435456;
+"""
+_db_local = threading.local()
+
 def get_db():
-    """Open a SQLite connection to the configured DB_PATH."""
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    """Return this thread's SQLite connection to the configured DB_PATH."""
+    conn = getattr(_db_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(SQLITE_PRAGMAS)
+        _db_local.conn = conn
     return conn
 
+@app.teardown_request
+def _release_db(exc):
+    # the connection outlives the request: never hand the next request an open transaction
+    conn = getattr(_db_local, "conn", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+# The log file is opened once, line-buffered, so each event is a single write() instead
+# of an open/write/close; the lock keeps lines from gthread workers from interleaving.
+_log_lock = threading.Lock()
+_log_fp = None
+
 def log_event(message: str):
+    global _log_fp
     try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(message.rstrip() + "\n")
+        with _log_lock:
+            if _log_fp is None:
+                _log_fp = open(LOG_FILE, "a", buffering=1, encoding="utf-8")
+            _log_fp.write(message.rstrip() + "\n")
     except Exception:
         pass
 
@@ -122,7 +155,6 @@ def db_check():
         if "records" in tables:
             cur.execute("SELECT COUNT(*) FROM records")
             out["records_count"] = cur.fetchone()[0]
-        conn.close()
         return jsonify(out)
     except Exception as e:
         out["error"] = str(e)
@@ -136,8 +168,8 @@ def get_records():
         cur = conn.cursor()
         # Will raise if table doesn't exist
         cur.execute("SELECT * FROM records")
-        rows = [dict(zip([c[0] for c in cur.description], r)) for r in cur.fetchall()]
-        conn.close()
+        cols = [c[0] for c in cur.description]  # once per query, not once per row
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
         return jsonify(rows)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,243 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# app_web reads DB_PATH and creates the schema at import, so point it at a scratch DB first.
+_TMP = tempfile.mkdtemp()
+os.environ["DB_PATH"] = os.path.join(_TMP, "harvest.db")
+os.environ.pop("OPENAI_API_KEY", None)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app_web  # noqa: E402
+
+
+class SchemaRetryTests(unittest.TestCase):
+    def test_failed_schema_setup_is_logged_and_retried(self):
+        client = app_web.flask_app.test_client()
+        app_web._schema_ready = False
+        locked = sqlite3.OperationalError("database is locked")
+        with mock.patch.object(app_web, "ensure_schema", side_effect=locked), \
+                self.assertLogs(app_web.flask_app.logger, "WARNING"):
+            client.get("/")
+        self.assertFalse(app_web._schema_ready)
+        self.assertEqual(client.get("/").status_code, 200)
+        self.assertTrue(app_web._schema_ready)
+
+class PooledConnectionTests(unittest.TestCase):
+    def test_connections_of_finished_threads_are_closed(self):
+        def hit():
+            client = app_web.flask_app.test_client()
+            self.assertEqual(client.get("/").status_code, 200)
+            self.assertEqual(client.get("/monitor").status_code, 200)
+
+        # one thread per request, like the threaded dev server; each new connection
+        # closes the ones left by threads that have exited
+        for _ in range(200):
+            t = threading.Thread(target=hit)
+            t.start()
+            t.join()
+
+        # at most the main thread's pair plus the pair of the last request's thread
+        self.assertLessEqual(len(app_web._db_open), 4)
+
+
+class FlowerDateTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app_web.flask_app.test_client()
+
+    def stored_flower_date(self, room):
+        row = app_web.get_db().execute("SELECT flower_date FROM records WHERE room=?", (room,)).fetchone()
+        return row["flower_date"]
+
+    def test_parse_matches_strptime(self):
+        self.assertEqual(app_web._parse_date_ymd("2026-11-2"), date(2026, 11, 2))
+        self.assertEqual(app_web._parse_date_ymd("2026-11-02 10:00"), date(2026, 11, 2))
+        self.assertIsNone(app_web._parse_date_ymd("2026/11/02"))
+        self.assertIsNone(app_web._parse_date_ymd(20261102))
+        self.assertIsNone(app_web._parse_date_ymd(None))
+
+    def test_add_and_edit_keep_dates_as_typed(self):
+        self.client.post("/add", data={"room": "PAD1", "plants": "3", "strain": "s", "flower_date": "2026-11-2"})
+        self.assertEqual(self.stored_flower_date("PAD1"), "2026-11-2")
+        rid = app_web.get_db().execute("SELECT id FROM records WHERE room='PAD1'").fetchone()[0]
+        self.client.post(f"/edit/{rid}", data={"room": "PAD1", "plants": "3", "strain": "s", "flower_date": "2026-11-02 10:30"})
+        self.assertEqual(self.stored_flower_date("PAD1"), "2026-11-02 10:30")
+
+    def test_trailing_text_survives_startup_and_edit(self):
+        con = app_web.get_db()
+        with con:
+            rid = con.execute("INSERT INTO records(room,plants,strain,flower_date) VALUES('PAD3',3,'s',?)",
+                              ("2026-11-2 moved from R3",)).lastrowid
+        app_web.ensure_schema()  # as at boot or after an import
+        self.assertEqual(self.stored_flower_date("PAD3"), "2026-11-2 moved from R3")
+        self.client.post(f"/edit/{rid}", data={"room": "PAD3", "plants": "4", "strain": "s",
+                                              "flower_date": "2026-11-2 moved from R3"})
+        self.assertEqual(self.stored_flower_date("PAD3"), "2026-11-2 moved from R3")
+        # still read as a date: 2026-11-02 + 63 days
+        self.assertIn("2027-01-04", self.client.get("/").get_data(as_text=True))
+
+    def test_unparseable_dates_are_kept_as_typed(self):
+        self.client.post("/add", data={"room": "PAD2", "plants": "3", "strain": "s", "flower_date": "next week"})
+        self.assertEqual(self.stored_flower_date("PAD2"), "next week")
+
+
+class DashboardDateTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # written behind the app's back, as by an import or an older version of the app
+        con = app_web.get_db()
+        with con:
+            con.executemany("INSERT INTO records(room,plants,strain,flower_date) VALUES(?,?,?,?)", [
+                ("DASH-OLD", 4, "s", "2001-1-5"),
+                ("DASH-NEW", 6, "s", "2099-3-7"),
+                ("DASH-NUM", 2, "s", 2461000),
+            ])
+        app_web.ensure_schema()
+
+    def setUp(self):
+        self.client = app_web.flask_app.test_client()
+
+    def test_stored_dates_are_left_alone(self):
+        rows = dict(app_web.get_db().execute(
+            "SELECT room, flower_date FROM records WHERE room LIKE 'DASH-%'").fetchall())
+        self.assertEqual(rows, {"DASH-OLD": "2001-1-5", "DASH-NEW": "2099-3-7", "DASH-NUM": "2461000"})
+
+    def test_dashboard_shows_harvest_and_days(self):
+        page = self.client.get("/").get_data(as_text=True)
+        self.assertIn("2001-03-09", page)
+        self.assertIn("2099-05-09", page)
+        self.assertIn(str((date(2099, 5, 9) - date.today()).days), page)
+
+    def test_future_filter_hides_overdue_rows(self):
+        page = self.client.get("/?future=1").get_data(as_text=True)
+        self.assertNotIn("DASH-OLD", page)
+        self.assertIn("DASH-NEW", page)
+        self.assertIn("DASH-NUM", page)  # no date: always shown
+
+    def test_numbers_are_not_read_as_julian_days(self):
+        row = app_web.get_db().execute(
+            "SELECT date(ymd(flower_date), '+63 days') FROM records WHERE room='DASH-NUM'"
+        ).fetchone()
+        self.assertIsNone(row[0])
+        self.assertNotIn("2026-01-22", self.client.get("/").get_data(as_text=True))
+
+
+def _baseline_clone_weeks(values, past_weeks=3):
+    """The pre-SQL implementation: strptime every row and bucket in Python."""
+    today = date.today()
+    earliest = today - timedelta(days=today.weekday()) - timedelta(weeks=past_weeks)
+    buckets = {}
+    for flower_date, plants in values:
+        try:
+            flower = datetime.strptime(str(flower_date).split()[0], "%Y-%m-%d").date()
+        except Exception:
+            continue
+        pl = int(plants or 0)
+        if not pl:
+            continue
+        week_start = flower - timedelta(days=flower.weekday())
+        if week_start >= earliest:
+            buckets[week_start] = buckets.get(week_start, 0) + pl
+    return [(wk.isoformat(), (wk + timedelta(weeks=9)).isoformat(), total) for wk, total in sorted(buckets.items())]
+
+
+class CloneDemandParityTests(unittest.TestCase):
+    # a DB of its own: only the rows inserted here count, and the other tests keep their fixtures
+    def setUp(self):
+        self.saved_db_path = app_web.DB_PATH
+        app_web.DB_PATH = Path(tempfile.mkdtemp()) / "parity.db"
+        app_web._reset_db_connections()
+        app_web.ensure_schema()
+
+    def tearDown(self):
+        app_web._reset_db_connections()
+        app_web.DB_PATH = self.saved_db_path
+
+    def test_sql_grouping_matches_python_baseline(self):
+        rnd = random.Random(1234)
+        today = date.today()
+        values = []
+        for _ in range(1500):
+            d = today + timedelta(days=rnd.randint(-60, 150))
+            text = rnd.choice([
+                d.isoformat(),
+                f"{d.year}-{d.month}-{d.day}",
+                f"{d.year}-{d.month:02d}-{d.day}",
+                d.isoformat() + " 10:30",
+                d.isoformat() + " junk",
+                " " + d.isoformat(),
+                d.isoformat() + "T10:30",
+                f"{d.year}-02-30",
+                f"{d.year}-13-01",
+                d.strftime("%Y/%m/%d"),
+                str(rnd.randint(2400000, 2500000)),
+                "",
+                None,
+            ])
+            values.append((text, rnd.choice([0, 1, 5, 12, 40])))
+        con = app_web.get_db()
+        with con:
+            con.executemany(
+                "INSERT INTO records(room,plants,strain,flower_date) VALUES('PARITY',?,'s',?)",
+                [(pl, text) for text, pl in values])
+        expected = _baseline_clone_weeks(values)
+        self.assertTrue(expected)
+
+        got = [(r["week"], r["harvest_week"], r["plants"]) for r in app_web.compute_clone_demand_grouped()]
+        self.assertEqual(got, expected)
+
+
+class CloneCacheInvalidationTests(unittest.TestCase):
+    def test_external_write_invalidates_cache_and_etag(self):
+        client = app_web.flask_app.test_client()
+        week = date.today() + timedelta(weeks=4)
+        week -= timedelta(days=week.weekday())
+        first = client.get("/clones")
+        before = {r["week"]: r["plants"] for r in app_web.compute_clone_demand_grouped()}
+
+        # another process (or a worker with its own counters) commits through its own connection
+        other = sqlite3.connect(os.environ["DB_PATH"])
+        with other:
+            other.execute("INSERT INTO records(room,plants,strain,flower_date) VALUES('EXT',7,'s',?)",
+                          (week.isoformat(),))
+        other.close()
+
+        after = {r["week"]: r["plants"] for r in app_web.compute_clone_demand_grouped()}
+        self.assertEqual(after.get(week.isoformat(), 0), before.get(week.isoformat(), 0) + 7)
+        revalidated = client.get("/clones", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertNotEqual(revalidated.headers["ETag"], first.headers["ETag"])
+
+
+
+class WorkerOptionsCacheTests(unittest.TestCase):
+    def test_external_write_refreshes_worker_options(self):
+        app_web.get_worker_options()
+        other = sqlite3.connect(os.environ["DB_PATH"])
+        with other:
+            other.execute("INSERT INTO workers(name) VALUES('Ext Worker')")
+        other.close()
+        self.assertIn("Ext Worker", [w["name"] for w in app_web.get_worker_options()])
+
+class CompressedETagTests(unittest.TestCase):
+    def test_revalidation_with_gzip(self):
+        client = app_web.flask_app.test_client()
+        gz = {"Accept-Encoding": "gzip"}
+        first = client.get("/clones", headers=gz)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(client.get("/clones", headers={**gz, "If-None-Match": first.headers["ETag"]}).status_code, 304)
+        # what older Flask-Compress releases hand the browser for a compressed page
+        tag = app_web._clone_page_etag("quick", "en")
+        for coding in ("gzip", "br", "deflate"):
+            resp = client.get("/clones", headers={**gz, "If-None-Match": f'W/"{tag}:{coding}"'})
+            self.assertEqual(resp.status_code, 304, coding)
+
+if __name__ == "__main__":
+    unittest.main()